@@ -0,0 +1,28 @@
+"""offline benchmarks for the mbapi parsers.
+
+    python -m benchmarks                      # everything
+    python -m benchmarks --quick              # skip the huge pages
+    python -m benchmarks --json now.json      # keep the numbers
+    python -m benchmarks --baseline then.json # exit 1 on regression
+
+nothing here touches the network.  pages come from two places:
+
+  * fixtures/, pages whose name says what they are (home-*.html,
+    classes-*.html, class-*.html).  the ones shipped here are synth
+    output edited by hand into shapes synth doesn't generate, and
+    say so at the top; drop your own scrubbed captures in there and
+    they join the corpus.
+  * synth, which generates pages of any size.
+
+for the network side there is a local stand-in server
+(python -m benchmarks.server) and a load driver running StudentAPI
+or AsyncStudentAPI against it (python -m benchmarks.load).  what
+every response costs us before parsing, in headers and cookies, is
+timed by python -m benchmarks.headers.
+
+python -m benchmarks.conformance checks that every installed HTML
+builder, with and without partial parsing, gives the same JSON.  python -m
+benchmarks.breaker checks that a probe dying of something we don't
+retry on doesn't leave the circuit breaker stuck half open.  python -m
+benchmarks.batch checks that mbapi.batch parses bytes like text.
+"""
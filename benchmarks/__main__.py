@@ -0,0 +1,157 @@
+"""run the parser benchmarks, see __init__.py"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import bs4
+
+from mbapi import api, metrics
+
+from .corpus import KINDS, all_cases
+
+# metric -> what it means, in the order they are printed
+METRICS = {
+    'parse_ms': 'building the DOM',
+    'extract_ms': 'running the extractor on the DOM',
+    'total_ms': 'the *_to_json function, text in, dict out',
+    'peak_kib': 'peak traced memory during total',
+    'held_blocks': 'memory blocks the DOM and result hold on to',
+}
+
+
+def timings(repeat, func, html_text, features, partial):
+    """Median parse_ms, extract_ms and total_ms of repeat calls.
+    The first two come from the parse event of the very call the
+    last is timed around (see mbapi.metrics), all on one clock, so
+    neither can come out above it.  The garbage collector is off
+    meanwhile, like in timeit.
+    """
+    rounds = []
+    events = []
+    metrics.add_hook(events.append)
+    # once for nothing, so that the first case isn't the one paying
+    # for cold caches
+    func(html_text, features=features, partial=partial)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            events.clear()
+            start = time.perf_counter()
+            func(html_text, features=features, partial=partial)
+            total = time.perf_counter() - start
+            event, = (event for event in events
+                      if event['function'] == func.__name__)
+            rounds.append((event['build'], event['extract'], total))
+            # off the clock
+            gc.collect()
+    finally:
+        if enabled:
+            gc.enable()
+        metrics.remove_hook(events.append)
+    parse, extract, total = (statistics.median(times) * 1000
+                             for times in zip(*rounds))
+    return dict(parse_ms=parse, extract_ms=extract, total_ms=total)
+
+
+def measure(case, repeat, features, partial):
+    func, strainer = KINDS[case.kind]
+    strainer = strainer if partial else None
+    html_text = case.html_text
+
+    row = timings(repeat, func, html_text, features, partial)
+
+    # memory is measured apart so that tracing doesn't skew the timings
+    gc.collect()
+    tracemalloc.start()
+    try:
+        dom = api._make_soup(html_text, features, strainer)
+        result = func(dom)
+        snapshot = tracemalloc.take_snapshot()
+        del dom, result
+        gc.collect()
+        tracemalloc.reset_peak()
+        func(html_text, features=features, partial=partial)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    row['peak_kib'] = peak / 1024
+    # blocks alive at the snapshot, not how many were ever allocated
+    row['held_blocks'] = sum(stat.count
+                             for stat in snapshot.statistics('filename'))
+    return row
+
+
+def compare(results, baseline, tolerance):
+    """yield (case, metric, then, now) for every regression."""
+    for name, now in results.items():
+        then = baseline.get(name)
+        if then is None:
+            continue
+        for metric in METRICS:
+            if metric in then and now[metric] > then[metric] * (1 + tolerance):
+                yield name, metric, then[metric], now[metric]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=f'{sys.executable} -m benchmarks',
+        description='offline benchmarks for the mbapi parsers')
+    parser.add_argument('--features', default=api.DEFAULT_FEATURES,
+                        help='HTML parser backend (default: %(default)s)')
+    parser.add_argument('--partial', action='store_true',
+                        help='benchmark partial=True parses')
+    parser.add_argument('--repeat', type=int, default=7,
+                        help='take the median of this many runs '
+                             '(default: %(default)s)')
+    parser.add_argument('--quick', action='store_true',
+                        help='skip the biggest synthetic pages')
+    parser.add_argument('-k', dest='pattern', default='',
+                        help='only cases whose name contains this')
+    parser.add_argument('--json', metavar='FILE',
+                        help='write the results here')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='fail if anything got slower or bigger '
+                             'than in this earlier --json output')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='how much worse counts as worse '
+                             '(default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f'{"case":<28}' + ''.join(f'{m:>12}' for m in METRICS))
+    for case in all_cases(args.quick):
+        if args.pattern not in case.name:
+            continue
+        row = measure(case, args.repeat, args.features, args.partial)
+        results[case.name] = row
+        print(f'{case.name:<28}' + ''.join(
+            f'{row[m]:>12.0f}' if m == 'held_blocks'
+            else f'{row[m]:>12.2f}' for m in METRICS), flush=True)
+
+    if args.json:
+        meta = dict(features=args.features, partial=args.partial,
+                    python=platform.python_version(),
+                    bs4=bs4.__version__)
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump(dict(meta=meta, results=results), fp, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as fp:
+            baseline = json.load(fp)['results']
+        regressions = list(compare(results, baseline, args.tolerance))
+        for name, metric, then, now in regressions:
+            print(f'REGRESSION {name} {metric}: {then:.2f} -> {now:.2f}',
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
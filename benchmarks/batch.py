@@ -0,0 +1,74 @@
+"""does mbapi.batch take bytes as well as text?
+
+    python -m benchmarks.batch              # exit 1 on a mismatch
+
+every quick page of the corpus goes through parse_pages() as str,
+bytes and memoryview, in process and in a pool, fully, partially,
+with the fast path (home pages) and through a ParseCache (in process
+only, a cache doesn't pickle), and has to come out the same as the
+plain parse of its text.
+"""
+import functools
+import json
+import sys
+
+from mbapi.batch import parse_pages
+from mbapi.memo import ParseCache
+from mbapi.util import json_default
+
+from .corpus import KINDS, all_cases
+
+__all__ = ['modes', 'check_case']
+
+
+def _dump(result):
+    return json.dumps(result, default=json_default, sort_keys=True)
+
+
+def modes(case):
+    """(name, kind, kwargs, pool) for every way case can be parsed;
+    pool says whether it can go to a process pool.
+    """
+    func, _ = KINDS[case.kind]
+    yield 'full', func, {}, True
+    yield 'partial', func, dict(partial=True), True
+    if case.kind == 'home':
+        yield 'fast', func, dict(fast=True), True
+    yield 'cache', functools.partial(ParseCache().parse, func), {}, False
+
+
+def check_case(case, workers=2):
+    """Names of the (mode, type, workers) combinations that fail or
+    differ from the plain parse.
+    """
+    func, _ = KINDS[case.kind]
+    expected = _dump(func(case.html_text))
+    data = case.html_text.encode('utf-8')
+    pages = dict(str=case.html_text, bytes=data, memoryview=memoryview(data))
+    mismatches = []
+    for name, kind, kwargs, pool in modes(case):
+        for n in (0, workers) if pool else (0,):
+            for type_name, page in pages.items():
+                label = f'{name} {type_name} workers={n}'
+                try:
+                    result, = parse_pages([page], kind, workers=n, **kwargs)
+                except Exception as e:
+                    mismatches.append(f'{label} ({e!r})')
+                    continue
+                if _dump(result) != expected:
+                    mismatches.append(label)
+    return mismatches
+
+
+def main(argv=None):
+    failed = False
+    for case in all_cases(quick=True):
+        mismatches = check_case(case)
+        failed = failed or bool(mismatches)
+        status = f'differs: {", ".join(mismatches)}' if mismatches else 'ok'
+        print(f'{case.name:<28}{status}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
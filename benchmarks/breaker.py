@@ -0,0 +1,113 @@
+"""does the circuit breaker reopen after a probe dies oddly?
+
+    python -m benchmarks.breaker            # exit 1 on a failure
+
+once the breaker is half open, one request goes through as the probe
+and everybody else waits for its verdict.  these trip a breaker, let
+the probe die of something the retry policy doesn't retry on (a
+redirect loop for StudentAPI, cancellation for AsyncStudentAPI) and
+check that the host is let through again after one more cooldown,
+instead of everybody waiting forever.
+"""
+import asyncio
+import http.server
+import sys
+import threading
+import time
+
+import requests
+
+from mbapi import StudentAPI
+from mbapi.throttle import CircuitBreaker, RetryPolicy
+
+from .server import StandInServer
+
+__all__ = ['check_sync', 'check_async']
+
+COOLDOWN = 0.2
+
+
+class _LoopHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        # redirect to ourselves until requests gives up
+        self.send_response(302)
+        self.send_header('Location', self.path)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def _tripped(host):
+    breaker = CircuitBreaker(threshold=1, cooldown=COOLDOWN)
+    breaker.record(host, False)
+    return breaker, RetryPolicy(attempts=1, breaker=breaker)
+
+
+def _reopens(breaker, host):
+    """Does the breaker let host through within two cooldowns?"""
+    deadline = time.monotonic() + 2 * COOLDOWN + 0.5
+    while time.monotonic() < deadline:
+        delay = breaker.wait(host)
+        if delay <= 0:
+            return True
+        time.sleep(min(delay, 0.05))
+    return False
+
+
+def check_sync():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _LoopHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        host, port = httpd.server_address
+        with StudentAPI(host, port, protocol='http') as api:
+            breaker, api._retry = _tripped(api._host())
+            time.sleep(COOLDOWN)
+            try:
+                api.get('/loop')
+            except requests.TooManyRedirects:
+                pass
+            else:
+                return False
+            return _reopens(breaker, api._host())
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def check_async():
+    from mbapi.aio import AsyncStudentAPI
+
+    async def probe(server):
+        async with AsyncStudentAPI(server.host, server.port,
+                                   protocol='http') as api:
+            breaker, api._retry = _tripped(api._host())
+            await asyncio.sleep(COOLDOWN)
+            task = asyncio.ensure_future(api.get('/student/home'))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            else:
+                return False
+            return _reopens(breaker, api._host())
+
+    # slow enough that the probe is still out when it is cancelled
+    with StandInServer(latency=1.0) as server:
+        return asyncio.run(probe(server))
+
+
+def main(argv=None):
+    failed = False
+    for name, check in (('sync', check_sync), ('asyncio', check_async)):
+        ok = check()
+        failed = failed or not ok
+        print(f'{name:<10}{"ok" if ok else "breaker stuck half open"}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
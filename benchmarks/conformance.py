@@ -0,0 +1,82 @@
+"""do all the HTML builders agree?
+
+    python -m benchmarks.conformance            # exit 1 on a mismatch
+    python -m benchmarks.conformance --quick
+
+every page of the corpus is parsed with every builder bs4 has
+installed (lxml, html.parser, html5lib), fully and partially, and
+the JSON that comes out has to be the same every time.  the current
+user found by the fast path of student_home_to_json(), which scans
+the text instead of building a DOM, has to match the DOM's, too.
+"""
+import argparse
+import json
+import sys
+
+import bs4
+
+from mbapi.api import student_home_to_json
+from mbapi.util import json_default
+
+from .corpus import KINDS, all_cases
+
+__all__ = ['BUILDERS', 'installed_builders', 'check_case']
+
+BUILDERS = ('lxml', 'html.parser', 'html5lib')
+
+
+def installed_builders():
+    return [name for name in BUILDERS
+            if bs4.builder.builder_registry.lookup(name) is not None]
+
+
+def _dump(result):
+    return json.dumps(result, default=json_default, sort_keys=True)
+
+
+def check_case(case, builders):
+    """Names of the (builder, partial) combinations whose output
+    differs from the first builder's full parse, and 'whoami fast'
+    if the fast path disagrees with the DOM.
+    """
+    func, _ = KINDS[case.kind]
+    expected = None
+    mismatches = []
+    for features in builders:
+        for partial in (False, True):
+            got = _dump(func(case.html_text, features=features,
+                             partial=partial))
+            if expected is None:
+                expected = got
+            elif got != expected:
+                mismatches.append(
+                    f'{features}{" partial" if partial else ""}')
+    # every page has the current user in it
+    if (_dump(student_home_to_json(case.html_text, fast=True))
+            != _dump(student_home_to_json(case.html_text,
+                                          features=builders[0]))):
+        mismatches.append('whoami fast')
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=f'{sys.executable} -m benchmarks.conformance',
+        description='check that every HTML builder gives the same JSON')
+    parser.add_argument('--quick', action='store_true',
+                        help='skip the huge pages')
+    args = parser.parse_args(argv)
+
+    builders = installed_builders()
+    print(f'builders: {", ".join(builders)}')
+    failed = False
+    for case in all_cases(args.quick):
+        mismatches = check_case(case, builders)
+        failed = failed or bool(mismatches)
+        status = f'differs: {", ".join(mismatches)}' if mismatches else 'ok'
+        print(f'{case.name:<28}{status}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""what gets benchmarked."""
+import os
+
+from mbapi import api
+
+from . import synth
+
+__all__ = ['KINDS', 'Case', 'fixtures', 'synthetic', 'all_cases']
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# page kind -> (extractor, strainer used for partial parses)
+KINDS = {
+    'home': (api.student_home_to_json, api._HOME_STRAINER),
+    'classes': (api.student_classes_to_json, api._CLASSES_STRAINER),
+    'class': (api.student_class_page_to_json, api._CLASS_PAGE_STRAINER),
+}
+
+
+class Case:
+    __slots__ = ('name', 'kind', 'html_text', 'big')
+
+    def __init__(self, name, kind, html_text, big=False):
+        if kind not in KINDS:
+            raise ValueError(f'unknown page kind {kind!r}')
+        self.name = name
+        self.kind = kind
+        self.html_text = html_text
+        # too slow for --quick
+        self.big = big
+
+
+def fixtures(directory=FIXTURES):
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext != '.html':
+            continue
+        kind = stem.split('-', 1)[0]
+        with open(os.path.join(directory, name), encoding='utf-8') as fp:
+            yield Case(f'fixture/{stem}', kind, fp.read())
+
+
+def synthetic():
+    yield Case('synth/home', 'home', synth.home_page())
+    for n in (10, 100, 1000, 5000):
+        yield Case(f'synth/roster-{n}', 'class',
+                   synth.class_page(n_teachers=3, n_students=n),
+                   big=n > 1000)
+    for n in (10, 100, 500):
+        yield Case(f'synth/classes-{n}', 'classes',
+                   synth.classes_page(n_classes=n, n_teachers=3),
+                   big=n > 100)
+
+
+def all_cases(quick=False):
+    for case in (*fixtures(), *synthetic()):
+        if quick and case.big:
+            continue
+        yield case
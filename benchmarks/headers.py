@@ -0,0 +1,164 @@
+"""per-response cost of looking at the headers.
+
+    python -m benchmarks.headers
+    python -m benchmarks.headers --number 20000
+
+every response we get has its Content-Type checked and, when the
+server rotates the session, its Set-Cookie picked apart for the new
+token and when it expires.  this times both, the way StudentAPI does
+them now and the way it used to (SimpleCookie, strptime and the
+email package, kept below for comparison), in microseconds per
+response.  first, though, the Set-Cookie parsing has to find the
+right token in every one of COOKIES, or this exits 1.
+"""
+import argparse
+import datetime
+import email.message
+import http.cookies
+import sys
+import time
+import timeit
+
+from mbapi import api
+from mbapi.util import parse_mime_header
+
+__all__ = ['SAMPLES', 'COOKIES', 'check_cookies', 'time_headers']
+
+
+def _expires(fmt='%a, %d %b %Y %H:%M:%S GMT'):
+    return time.strftime(fmt, time.gmtime(time.time() + 86400))
+
+
+# what comes back from the stand-in server (and ManageBac), plus the
+# Set-Cookie requests hands us when there is more than one of them
+SAMPLES = {
+    'content-type': 'text/html; charset=utf-8',
+    'set-cookie': (f'_managebac_session=ZW5jcnlwdGVk%3D%3D--0123456789abcdef;'
+                   f' path=/; expires={_expires()}; HttpOnly'),
+    'set-cookie-rfc2109': (f'_managebac_session=ZW5jcnlwdGVk%3D%3D--01234567;'
+                           f' path=/; expires='
+                           f'{_expires("%a, %d-%b-%Y %H:%M:%S GMT")}'),
+    'set-cookie-folded': (f'remember_user_token=abc; path=/; expires='
+                          f'{_expires()}; HttpOnly, _managebac_session='
+                          f'ZW5jcnlwdGVk%3D%3D--89abcdef; path=/; HttpOnly'),
+}
+
+# Set-Cookie -> the token that should come out of it
+COOKIES = {
+    SAMPLES['set-cookie']: 'ZW5jcnlwdGVk%3D%3D--0123456789abcdef',
+    SAMPLES['set-cookie-rfc2109']: 'ZW5jcnlwdGVk%3D%3D--01234567',
+    SAMPLES['set-cookie-folded']: 'ZW5jcnlwdGVk%3D%3D--89abcdef',
+    '_managebac_session="quoted"; path=/': 'quoted',
+    # an attribute of another cookie, not a cookie
+    'other=1; _managebac_session=zzz': None,
+    'other=1; _managebac_session=zzz, x=2; path=/': None,
+    'other=1; path=/, _managebac_session=next; path=/': 'next',
+    # the last one wins, like it does in a cookie jar
+    (f'_managebac_session=old; expires={_expires()}, '
+     f'_managebac_session=new; path=/'): 'new',
+}
+
+
+def check_cookies():
+    """The COOKIES our _set_cookie() gets wrong, as (raw, expected,
+    got) tuples.
+    """
+    wrong = []
+    for raw, expected in COOKIES.items():
+        cookies = _NewCookies()
+        cookies.token = None
+        cookies._set_cookie(raw)
+        if cookies.token != expected:
+            wrong.append((raw, expected, cookies.token))
+    return wrong
+
+
+def _old_parse_mime_header(header):
+    msg = email.message.EmailMessage()
+    msg['Content-Type'] = header
+    return msg.get_content_type(), msg['Content-Type'].params
+
+
+def _old_parse_expires(s):
+    try:
+        dt = datetime.datetime.strptime(s, '%a, %d %b %Y %H:%M:%S GMT')
+    except ValueError:
+        dt = datetime.datetime.strptime(s, '%a, %d-%b-%Y %H:%M:%S GMT')
+    return dt.replace(tzinfo=datetime.timezone.utc)
+
+
+class _OldCookies:
+    __slots__ = ('token', 'expires')
+
+    def _set_cookie(self, rawcookie):
+        cookie = http.cookies.SimpleCookie()
+        cookie.load(rawcookie)
+        token = cookie.get('_managebac_session')
+        if isinstance(token, http.cookies.Morsel):
+            self.token = token.value
+            expires = token.get('expires')
+            if isinstance(expires, str) and expires:
+                self.expires = _old_parse_expires(expires)
+
+
+class _NewCookies:
+    __slots__ = ('token', 'expires')
+
+    _set_cookie = api._StudentBase._set_cookie
+
+
+def time_headers(number=10000):
+    """{case: (old, new)} in microseconds per call."""
+    def per_call(func):
+        best = min(timeit.repeat(func, number=number, repeat=3))
+        return best / number * 1e6
+
+    results = {}
+    content_type = SAMPLES['content-type']
+    results['content-type'] = (
+        per_call(lambda: _old_parse_mime_header(content_type)),
+        per_call(lambda: parse_mime_header(content_type)))
+    for case in ('set-cookie', 'set-cookie-rfc2109', 'set-cookie-folded'):
+        raw = SAMPLES[case]
+        old, new = _OldCookies(), _NewCookies()
+        results[case] = (per_call(lambda: old._set_cookie(raw)),
+                         per_call(lambda: new._set_cookie(raw)))
+    # a response that rotates the cookie pays for both
+    raw = SAMPLES['set-cookie']
+    old, new = _OldCookies(), _NewCookies()
+
+    def old_response():
+        _old_parse_mime_header(content_type)
+        old._set_cookie(raw)
+
+    def new_response():
+        api._check_html_type(content_type)
+        new._set_cookie(raw)
+
+    results['response'] = (per_call(old_response), per_call(new_response))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=f'{sys.executable} -m benchmarks.headers',
+        description='header handling microbenchmarks')
+    parser.add_argument('--number', type=int, default=10000,
+                        help='calls per timing (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    wrong = check_cookies()
+    for raw, expected, got in wrong:
+        print(f'WRONG TOKEN {got!r} instead of {expected!r} from {raw!r}',
+              file=sys.stderr)
+    if wrong:
+        return 1
+
+    print(f'{"":<20}{"before":>10}{"after":>10}')
+    for case, (old, new) in time_headers(args.number).items():
+        print(f'{case:<20}{old:>8.2f}us{new:>8.2f}us  {old / new:>6.1f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
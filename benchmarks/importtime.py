@@ -0,0 +1,114 @@
+"""how long does `import mbapi...` take, and what does it drag in?
+
+    python -m benchmarks.importtime            # exit 1 on regression
+    python -m benchmarks.importtime --budget 30
+
+every target is imported in a fresh interpreter under
+python -X importtime (mbapi.__main__, which can't be imported, is run
+with --help instead and timed as a whole).  a target fails if it loads one of the modules
+it is supposed to leave alone, or if its own cumulative import time
+goes over the budget (best of --repeat runs, in milliseconds).
+"""
+import argparse
+import subprocess
+import sys
+
+__all__ = ['import_time', 'TARGETS']
+
+# target -> modules it must not import
+TARGETS = {
+    'mbapi': ('requests', 'bs4', 'requests_toolbelt'),
+    'mbapi.util': ('requests', 'bs4', 'requests_toolbelt'),
+    'mbapi.metrics': ('requests', 'bs4'),
+    'mbapi.throttle': ('requests', 'bs4'),
+    'mbapi.store': ('requests', 'bs4'),
+    'mbapi.delta': ('requests', 'bs4'),
+    'mbapi.cache': ('requests', 'bs4'),
+    'mbapi.memo': ('requests', 'bs4'),
+    'mbapi.records': ('requests', 'bs4'),
+    # bs4 is loaded by the first parse, requests by the first client
+    'mbapi.api': ('requests', 'bs4', 'requests_toolbelt'),
+    # --help shouldn't wait for either
+    'mbapi.__main__': ('requests', 'bs4', 'requests_toolbelt'),
+}
+
+_PROBE = '''\
+import sys
+import {target}
+print(' '.join(sorted(sys.modules)))
+'''
+
+# python -X importtime doesn't list the module runpy runs, so this
+# one times itself
+_MAIN_PROBE = '''\
+import contextlib, io, runpy, sys, time
+sys.argv = ['{target}', '--help']
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        runpy.run_module('{package}', run_name='__main__')
+    except SystemExit:
+        pass
+print(round((time.perf_counter() - start) * 1e6))
+print(' '.join(sorted(sys.modules)))
+'''
+
+
+def import_time(target):
+    """(milliseconds, set of modules loaded) for importing target in
+    a new interpreter.
+    """
+    package, _, name = target.rpartition('.')
+    if name == '__main__':
+        proc = subprocess.run(
+            [sys.executable, '-c',
+             _MAIN_PROBE.format(target=target, package=package)],
+            capture_output=True, text=True, check=True)
+        micros, modules = proc.stdout.split('\n', 1)
+        return int(micros) / 1000, set(modules.split())
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         _PROBE.format(target=target)],
+        capture_output=True, text=True, check=True)
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:'):
+            continue
+        _, cumul, name = line[len('import time:'):].split('|')
+        if name.strip() == target:
+            cumulative = int(cumul)
+    if cumulative is None:
+        raise RuntimeError(f'{target} was never imported?')
+    return cumulative / 1000, set(proc.stdout.split())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=f'{sys.executable} -m benchmarks.importtime',
+        description='import time regression check')
+    parser.add_argument('--budget', type=float, default=50,
+                        help='milliseconds each target may take, not '
+                             'counting mbapi.api (default: %(default)s)')
+    parser.add_argument('--api-budget', type=float, default=100,
+                        help='milliseconds for mbapi.api, which compiles '
+                             'all of its selectors (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for target, forbidden in TARGETS.items():
+        runs = [import_time(target) for _ in range(args.repeat)]
+        ms = min(ms for ms, _ in runs)
+        loaded = runs[0][1]
+        budget = args.api_budget if target == 'mbapi.api' else args.budget
+        problems = [f'loads {name}' for name in forbidden if name in loaded]
+        if ms > budget:
+            problems.append(f'over budget ({budget:g} ms)')
+        failed = failed or bool(problems)
+        print(f'{target:<16}{ms:>9.1f} ms  {"; ".join(problems) or "ok"}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""end-to-end client throughput against the stand-in server.
+
+    python -m benchmarks.load --accounts 50 --rounds 4 --latency 80
+
+every account logs in with a token the server issued, then runs
+`rounds` of whoami + class list + every class page, with up to
+--concurrency accounts at a time.  reported are pages per second,
+per-page latency percentiles and how many times cookies rotated.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import statistics
+import sys
+import time
+
+from mbapi import StudentAPI
+
+from .server import StandInServer
+
+__all__ = ['run_threads', 'run_asyncio']
+
+
+def _crawl_sync(api, rounds, timings):
+    refreshes = 0
+    for _ in range(rounds):
+        for step in (api.whoami, api.get_my_classes_json):
+            token = api.token
+            start = time.perf_counter()
+            result = step()
+            timings.append(time.perf_counter() - start)
+            refreshes += api.token != token
+        for cls in result['classes']:
+            token = api.token
+            start = time.perf_counter()
+            api.get_class_page_json(cls['class_id'])
+            timings.append(time.perf_counter() - start)
+            refreshes += api.token != token
+    return refreshes
+
+
+def run_threads(server, accounts, rounds, concurrency, **options):
+    """one StudentAPI per account on a thread pool."""
+    timings = []
+
+    def one(_):
+        with StudentAPI(server.host, server.port, protocol='http',
+                        **options) as api:
+            api.token = server.issue_token()
+            return _crawl_sync(api, rounds, timings)
+
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        refreshes = sum(executor.map(one, range(accounts)))
+    return timings, refreshes
+
+
+async def _crawl_async(api, rounds, timings):
+    refreshes = 0
+    for _ in range(rounds):
+        for step in (api.whoami, api.get_my_classes_json):
+            token = api.token
+            start = time.perf_counter()
+            result = await step()
+            timings.append(time.perf_counter() - start)
+            refreshes += api.token != token
+        for cls in result['classes']:
+            token = api.token
+            start = time.perf_counter()
+            await api.get_class_page_json(cls['class_id'])
+            timings.append(time.perf_counter() - start)
+            refreshes += api.token != token
+    return refreshes
+
+
+def run_asyncio(server, accounts, rounds, concurrency, **options):
+    """one AsyncStudentAPI per account on a single event loop."""
+    from mbapi.aio import AsyncStudentAPI
+
+    timings = []
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                async with AsyncStudentAPI(server.host, server.port,
+                                           protocol='http',
+                                           **options) as api:
+                    api.token = server.issue_token()
+                    return await _crawl_async(api, rounds, timings)
+
+        return sum(await asyncio.gather(*(one() for _ in range(accounts))))
+
+    refreshes = asyncio.run(main())
+    return timings, refreshes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=f'{sys.executable} -m benchmarks.load',
+        description='client throughput against the stand-in server')
+    parser.add_argument('--mode', choices=('threads', 'asyncio'),
+                        default='threads')
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--classes', type=int, default=8)
+    parser.add_argument('--students', type=int, default=25)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='server latency in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='server jitter in milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--no-etags', dest='etags', action='store_false')
+    parser.add_argument('--fixtures', metavar='DIR',
+                        help='have the server serve the pages in DIR')
+    args = parser.parse_args(argv)
+
+    run = run_threads if args.mode == 'threads' else run_asyncio
+    with StandInServer(n_classes=args.classes, n_students=args.students,
+                       latency=args.latency / 1000,
+                       jitter=args.jitter / 1000,
+                       error_rate=args.error_rate, etags=args.etags,
+                       strict=True, fixtures=args.fixtures) as server:
+        start = time.perf_counter()
+        timings, refreshes = run(server, args.accounts, args.rounds,
+                                 args.concurrency)
+        elapsed = time.perf_counter() - start
+
+    timings.sort()
+    q = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings
+    print(f'{len(timings)} pages in {elapsed:.2f}s '
+          f'({len(timings) / elapsed:.1f} pages/s)')
+    print(f'latency ms: p50 {q[49] * 1000:.1f}  p90 {q[89] * 1000:.1f}  '
+          f'p99 {q[98] * 1000:.1f}  max {timings[-1] * 1000:.1f}')
+    print(f'cookie refreshes: {refreshes}; server: {server.stats}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
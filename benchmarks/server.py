@@ -0,0 +1,312 @@
+"""a local stand-in for a ManageBac server.
+
+    python -m benchmarks.server --port 8000 --latency 80 --jitter 40
+
+then point a client at it with StudentAPI('127.0.0.1', 8000,
+protocol='http').  pages come from synth, or from --fixtures DIR when
+there is a file there for the path:
+
+    /student/home                   home*.html (the first, sorted)
+    /student/classes/my             classes*.html (likewise)
+    /student/classes/ID             class-ID.html
+    /student/classes/ID/popover     popover-ID.html
+
+every response rotates the _managebac_session cookie like the real
+thing, and latency, jitter, errors and 304s are all up to you.
+"""
+import argparse
+import email.utils
+import glob
+import hashlib
+import http.server
+import itertools
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+
+from . import synth
+
+__all__ = ['StandInServer']
+
+ROUTES = [
+    (re.compile(r'/student/home'), 'home'),
+    (re.compile(r'/student/classes/my'), 'classes'),
+    (re.compile(r'/student/classes/(\d+)/popover'), 'popover'),
+    (re.compile(r'/student/classes/(\d+)'), 'class'),
+    (re.compile(r'/uploads/user/(\d+)/\w+\.png'), 'avatar'),
+]
+
+# the cookie outlives the request by a day, like on the real server
+COOKIE_LIFETIME = 24 * 60 * 60
+
+
+class StandInServer:
+    """Serve synthetic ManageBac pages on (host, port); port 0 picks
+    a free one.  Use it as a context manager, or start() and stop().
+
+    latency and jitter are in seconds: every response is held back by
+    latency plus or minus up to jitter.  error_rate is the fraction
+    of requests answered with a 429, 500 or 503 instead.  If etags,
+    pages carry an ETag and Last-Modified and conditional requests get
+    a 304.  If strict, a request is refused with 401 unless it carries
+    a token this server handed out (or one of `tokens`).  fixtures
+    is a directory of pages served instead of synth's (see above).
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, *, n_classes=8,
+                 n_teachers=2, n_students=25, latency=0.0, jitter=0.0,
+                 error_rate=0.0, etags=True, strict=False, tokens=(),
+                 seed=None, fixtures=None):
+        self.n_classes = n_classes
+        self.n_teachers = n_teachers
+        self.n_students = n_students
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.etags = etags
+        self.strict = strict
+        self.fixtures = fixtures
+        self.started = email.utils.formatdate(usegmt=True)
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._tokens = set(tokens)
+        self._issued = itertools.count()
+        self.stats = dict(requests=0, not_modified=0, errors=0,
+                          unauthorized=0)
+
+        self._httpd = http.server.ThreadingHTTPServer(
+            (host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._httpd.server_address[0]
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.stop()
+        return None
+
+    def page(self, path):
+        """(body, etag) for path, or None if there is no such page."""
+        with self._lock:
+            if path in self._pages:
+                return self._pages[path]
+        for pattern, kind in ROUTES:
+            match = pattern.fullmatch(path)
+            if match is not None:
+                break
+        else:
+            return None
+        body = self._fixture(kind, match)
+        if body is None:
+            body = self._synth(kind, match)
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+        with self._lock:
+            self._pages[path] = body, etag
+        return body, etag
+
+    def _synth(self, kind, match):
+        if kind == 'avatar':
+            return synth.avatar_image(int(match.group(1)))
+        if kind == 'home':
+            text = synth.home_page()
+        elif kind == 'classes':
+            text = synth.classes_page(self.n_classes, self.n_teachers)
+        elif kind == 'class':
+            text = synth.class_page(int(match.group(1)),
+                                    self.n_teachers, self.n_students)
+        else:
+            text = synth.popover(int(match.group(1)),
+                                 self.n_teachers, self.n_students)
+        return text.encode('utf-8')
+
+    def _fixture(self, kind, match):
+        if self.fixtures is None or kind == 'avatar':
+            return None
+        if kind in ('home', 'classes'):
+            names = sorted(glob.glob(os.path.join(
+                glob.escape(self.fixtures), f'{kind}*.html')))
+            path = names[0] if names else None
+        else:
+            path = os.path.join(self.fixtures,
+                                f'{kind}-{match.group(1)}.html')
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, 'rb') as fp:
+            return fp.read()
+
+    def issue_token(self):
+        token = f'{next(self._issued):08x}{secrets.token_hex(24)}'
+        with self._lock:
+            self._tokens.add(token)
+        return token
+
+    def knows(self, token):
+        with self._lock:
+            return token in self._tokens
+
+    def delay(self):
+        with self._lock:
+            spread = self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.latency + spread)
+
+    def roll_error(self):
+        with self._lock:
+            if self._random.random() >= self.error_rate:
+                return None
+            return self._random.choice((429, 500, 503))
+
+    def count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+
+def _make_handler(server):
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            server.count('requests')
+            time.sleep(server.delay())
+            path = self.path.split('?', 1)[0]
+
+            status = server.roll_error()
+            if status is not None:
+                server.count('errors')
+                headers = {}
+                if status != 500:
+                    headers['Retry-After'] = '1'
+                return self.reply(status, headers=headers)
+
+            if server.strict and not server.knows(self.session_token()):
+                server.count('unauthorized')
+                return self.reply(401)
+
+            page = server.page(path)
+            if page is None:
+                return self.reply(404, cookie=True)
+            body, etag = page
+
+            if path.startswith('/uploads/'):
+                headers = {'Content-Type': 'image/png'}
+            else:
+                headers = {'Content-Type': 'text/html; charset=utf-8'}
+            if server.etags:
+                headers['ETag'] = etag
+                headers['Last-Modified'] = server.started
+                if self.not_modified(etag):
+                    server.count('not_modified')
+                    return self.reply(304, headers=headers, cookie=True)
+            return self.reply(200, body, headers, cookie=True)
+
+        def session_token(self):
+            for part in self.headers.get('Cookie', '').split(';'):
+                name, _, value = part.strip().partition('=')
+                if name == '_managebac_session':
+                    return value
+            return None
+
+        def not_modified(self, etag):
+            match = self.headers.get('If-None-Match')
+            if match is not None:
+                return etag in {tag.strip() for tag in match.split(',')}
+            return self.headers.get('If-Modified-Since') == server.started
+
+        def reply(self, status, body=b'', headers=None, cookie=False):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            if cookie:
+                expires = email.utils.formatdate(
+                    time.time() + COOKIE_LIFETIME, usegmt=True)
+                self.send_header(
+                    'Set-Cookie',
+                    f'_managebac_session={server.issue_token()}; path=/; '
+                    f'expires={expires}; HttpOnly')
+            if status != 304:
+                self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(body)
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog=f'{sys.executable} -m benchmarks.server',
+        description='local stand-in ManageBac server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--classes', type=int, default=8)
+    parser.add_argument('--teachers', type=int, default=2)
+    parser.add_argument('--students', type=int, default=25)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='milliseconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='milliseconds of random spread on latency')
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--no-etags', dest='etags', action='store_false',
+                        help='never send validators or 304s')
+    parser.add_argument('--strict', action='store_true',
+                        help='refuse tokens this server did not issue')
+    parser.add_argument('--token', action='append', default=[],
+                        help='accept this token too (with --strict)')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--fixtures', metavar='DIR',
+                        help='serve the pages in DIR instead of synth\'s '
+                             'where there is one')
+    args = parser.parse_args(argv)
+
+    server = StandInServer(
+        args.host, args.port, n_classes=args.classes,
+        n_teachers=args.teachers, n_students=args.students,
+        latency=args.latency / 1000, jitter=args.jitter / 1000,
+        error_rate=args.error_rate, etags=args.etags, strict=args.strict,
+        tokens=args.token, seed=args.seed, fixtures=args.fixtures)
+    print(f'serving on http://{server.host}:{server.port}/', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
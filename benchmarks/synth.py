@@ -0,0 +1,231 @@
+"""synthetic ManageBac pages.
+
+these follow the markup mbapi.api expects rather than any captured
+page, but can be blown up to any size: rosters of thousands of
+members, class lists of hundreds of classes.  everything is derived
+from the arguments, so the same call always gives the same bytes.
+"""
+import html
+import json
+import struct
+import zlib
+
+__all__ = ['home_page', 'classes_page', 'class_page', 'popover',
+           'user_name', 'avatar_image']
+
+ME = 100
+TEACHER_BASE = 20000
+STUDENT_BASE = 30000
+
+
+def user_name(user_id):
+    """SAIE style: first (NICK) last | second"""
+    return f'First{user_id} (Nick{user_id}) Last{user_id} | 名{user_id}'
+
+
+def _esc(s):
+    return html.escape(s, quote=True)
+
+
+def avatar(user_id, size='tiny', empty=False):
+    initials = f'F{user_id % 10}'
+    if empty:
+        return (f'<div class="avatar {size} empty" '
+                f'data-initials="{initials}" data-id="{user_id}"></div>')
+    return (f'<div class="avatar {size}" '
+            f'style="background-image: url(/uploads/user/{user_id}/'
+            f'tiny_{user_id:08x}.png);" '
+            f'data-initials="{initials}" data-id="{user_id}"></div>')
+
+
+def _png_chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def avatar_image(user_id, size=16):
+    """A flat-colored PNG for the avatar of user_id.  There are only
+    a handful of colors, so plenty of users share the same image.
+    """
+    color = bytes(((user_id % 7) * 36, 128, 255 - (user_id % 7) * 36))
+    rows = b''.join(b'\0' + color * size for _ in range(size))
+    return (b'\x89PNG\r\n\x1a\n'
+            + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', size, size,
+                                              8, 2, 0, 0, 0))
+            + _png_chunk(b'IDAT', zlib.compress(rows))
+            + _png_chunk(b'IEND', b''))
+
+
+def _noise(n):
+    # the menus, widgets and footers every page drags along,
+    # none of which anybody here reads
+    items = ''.join(
+        f'<li class="menu-item"><a href="/student/section/{i}">'
+        f'<i class="fa fa-icon-{i}"></i><span>Section {i}</span></a></li>'
+        for i in range(n))
+    return f'<aside class="sidebar"><ul class="menu">{items}</ul></aside>'
+
+
+def _chrome(content, user_id=ME, noise=40):
+    lou = json.dumps({
+        'user_email': f'student{user_id}@example.com',
+        'user_role': 'Student',
+        'user_created_at': 1686009960,
+    })
+    name = _esc(user_name(user_id))
+    return f'''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>ManageBac | {name}</title>
+<link rel="stylesheet" href="/assets/application-0123abcd.css">
+<script src="/assets/application-4567cdef.js"></script>
+</head>
+<body class="student-layout" data-user-id="{user_id}" data-airbrake-user-id="{user_id}">
+<div class="navbar navbar-collapse">
+<a class="brand" href="/student/home">ManageBac</a>
+<div class="profile-link"><a href="/student/profile">{avatar(user_id, 'micro')}</a></div>
+</div>
+{_noise(noise)}
+<main class="content">
+{content}
+</main>
+<div id="zendesk-widget" data-email="student{user_id}@example.com" data-role="Student" data-user="{name}"></div>
+<footer class="footer"><p>&copy; Faria Education Group</p></footer>
+<script>
+//<![CDATA[
+window.I18n = {{"locale": "en", "fallbacks": true}};
+//]]>
+</script>
+<script>
+//<![CDATA[
+function LOU_init() {{
+  LOU.identify('{user_id}', {lou})
+}}
+//]]>
+</script>
+</body>
+</html>
+'''
+
+
+def home_page(user_id=ME):
+    return _chrome('<div class="dashboard"><h2>Upcoming</h2></div>',
+                   user_id)
+
+
+def _teacher_table(class_id, n_teachers):
+    rows = ''.join(
+        f'<tr><td>{avatar(TEACHER_BASE + class_id % 50 + t)} '
+        f'{_esc(user_name(TEACHER_BASE + class_id % 50 + t))}</td></tr>'
+        for t in range(n_teachers))
+    return f'<table>{rows}</table>'
+
+
+def _section(kind, class_id, n_items, path, label=None):
+    items = []
+    for i in range(n_items):
+        item_id = class_id * 100 + i
+        tag = f'<span class="label">{label}</span>' if label else ''
+        items.append(
+            f'<div class="{kind}">{tag}'
+            f'<a href="/student/classes/{class_id}/{path}/{item_id}">'
+            f'{kind.title()} {i + 1} of class {class_id}</a>'
+            f'<time datetime="2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}">'
+            f'{i % 28 + 1}/{i % 12 + 1}</time></div>')
+    return f'<div class="{kind}s-container">{"".join(items)}</div>'
+
+
+def _class_div(class_id, n_teachers, n_tasks=None):
+    # only the first teacher shows up as an avatar, and hovering it
+    # reveals the lot (see _update_class_info)
+    first = TEACHER_BASE + class_id % 50
+    hint = _esc(_teacher_table(class_id, n_teachers))
+    spans = (f'<span class="user-link" title="{_esc(user_name(first))}">'
+             f'<div data-hint="{hint}">{avatar(first)}</div></span>')
+    return f'''<div id="ib_class{class_id}" class="ib-class">
+<div class="ib-class-row">
+<img class="sebo-icon" src="/assets/sebo/{class_id % 12}.svg">
+<h4 class="title">
+<a href="/student/classes/{class_id}">
+  Class {class_id}
+</a>
+<span class="fusion-popover" data-hint-url="/student/classes/{class_id}/popover"></span>
+</h4>
+<div class="class-dropdown">
+<div class="class-dropdown-item"><div class="number">{class_id % 7}</div><div class="text">Units</div></div>
+<div class="class-dropdown-item"><div class="number">{class_id % 23}</div><div class="text">Tasks</div></div>
+<div class="class-dropdown-item"><div class="number">{class_id % 5}</div><div class="text">Updates</div></div>
+<div class="flex-start">{spans}</div>
+</div>
+</div>
+{_section('unit', class_id, class_id % 7, 'units')}
+{_section('task', class_id, class_id % 23 if n_tasks is None else n_tasks,
+          'core_tasks', 'Summative')}
+{_section('update', class_id, class_id % 5, 'discussions')}
+</div>
+'''
+
+
+def classes_page(n_classes=8, n_teachers=2, first_id=1000, n_tasks=None):
+    """n_tasks is the length of every task list; by default it is
+    whatever the class's dropdown says.
+    """
+    divs = ''.join(_class_div(first_id + c, n_teachers, n_tasks)
+                   for c in range(n_classes))
+    return _chrome(f'<div id="classes">{divs}</div>')
+
+
+def popover(class_id, n_teachers=2, n_students=20):
+    teachers = ''.join(
+        f'<li>{_esc(user_name(TEACHER_BASE + class_id % 50 + t))}</li>'
+        for t in range(n_teachers))
+    return f'''<div class="popover-content">
+<dl>
+<dt>Subject</dt><dd class="subject">Subject {class_id % 9}</dd>
+<dt>Teachers</dt><dd class="teachers"><ul>{teachers}</ul></dd>
+<dt>Students</dt><dd class="students">{n_students}</dd>
+</dl>
+</div>
+'''
+
+
+def _teacher_member(user_id):
+    name = _esc(user_name(user_id))
+    return f'''<div class="member">
+<div class="js-section-owner" title="{name}" data-author-id="{user_id}">{avatar(user_id)}</div>
+<div class="info stretch">
+<div class="user-name"><a href="/student/teachers/{user_id}">{name}</a></div>
+<ul class="extra">
+<li><a href="mailto:t{user_id}@example.com">t{user_id}@example.com</a></li>
+<li><a href="tel:+86-000-{user_id:04d}">+86-000-{user_id:04d}</a></li>
+</ul>
+</div>
+</div>
+'''
+
+
+def _student_member(user_id):
+    # every third student never uploaded a picture
+    return (f'<div class="member" title="{_esc(user_name(user_id))}">'
+            f'{avatar(user_id, empty=user_id % 3 == 0)}</div>\n')
+
+
+def class_page(class_id=1000, n_teachers=2, n_students=25):
+    teachers = ''.join(_teacher_member(TEACHER_BASE + class_id % 50 + t)
+                       for t in range(n_teachers))
+    students = ''.join(_student_member(STUDENT_BASE + s)
+                       for s in range(n_students))
+    return _chrome(f'''<div class="content-block">
+<div class="content-block-header">
+  Class {class_id}
+</div>
+<div class="class-overview"><p>Welcome to the class.</p></div>
+<div id="ib_class_{class_id}"></div>
+</div>
+<section class="js-members-section">
+<div class="teachers-list">{teachers}</div>
+<div class="students-list">{students}</div>
+</section>
+''')
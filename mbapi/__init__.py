@@ -2,4 +2,15 @@
 
 __all__ = ['StudentAPI']
 
-from .api import StudentAPI
+
+# importing the package shouldn't cost an import of requests and
+# bs4, so StudentAPI is only fetched when asked for
+def __getattr__(name):
+    if name == 'StudentAPI':
+        from .api import StudentAPI
+        return StudentAPI
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted({*globals(), *__all__})
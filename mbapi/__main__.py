@@ -4,12 +4,187 @@ if not __name__ == '__main__':
     assert 1*0 == 1, "that's weird"
 
 import argparse
+import concurrent.futures
+import json
+import logging
+import os
 import shlex
 import sys
 
-from .api import StudentAPI
+from .throttle import CircuitBreaker, RateLimiter, RetryPolicy
+from .util import json_default
+
+
+def _bounded(executor, func, items, limit):
+    """Like executor.map(), but in completion order, and with at
+    most limit calls submitted at a time instead of all of them.
+    Yields (item, future).
+    """
+    items = iter(items)
+    pending = {}
+    for item in items:
+        pending[executor.submit(func, item)] = item
+        if len(pending) >= limit:
+            break
+    while pending:
+        done, _ = concurrent.futures.wait(
+            pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future
+            for item in items:
+                pending[executor.submit(func, item)] = item
+                break
+
+
+class _Checkpoint:
+    """Keys of the records already written, one per line, appended
+    as we go so that an interrupted crawl can pick up where it was.
+    """
+
+    def __init__(self, file):
+        self.done = set()
+        self._fp = None
+        if file is None:
+            return
+        if os.path.exists(file):
+            with open(file, encoding='utf-8') as fp:
+                self.done.update(line.strip() for line in fp)
+            self.done.discard('')
+        self._fp = open(file, 'a', encoding='utf-8')
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def mark(self, key):
+        self.done.add(key)
+        if self._fp is not None:
+            self._fp.write(key + '\n')
+            self._fp.flush()
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+
+
+def crawl(args):
+    if args.concurrency < 1:
+        crawl_parser.error('concurrency must be at least 1')
+    # not at the top, so that --help doesn't wait for requests and bs4
+    from .api import StudentAPI
+
+    limiter = RateLimiter(args.rate, args.burst) if args.rate else None
+    retry = (RetryPolicy(args.retries + 1, breaker=CircuitBreaker())
+             if args.retries else None)
+    checkpoint = _Checkpoint(args.checkpoint)
+    if args.output == '-':
+        out = sys.stdout
+    else:
+        # resuming adds to what the last run wrote
+        out = open(args.output, 'a' if checkpoint.done else 'w',
+                   encoding='utf-8')
+
+    def emit(key, kind, record):
+        # output first: if we die in between, a record shows up
+        # twice on resume rather than never
+        out.write(json.dumps(dict(kind=kind, record=record),
+                             ensure_ascii=False, default=json_default)
+                  + '\n')
+        out.flush()
+        checkpoint.mark(key)
+
+    api = StudentAPI(args.domain, args.port, args.protocol,
+                     partial=True, limiter=limiter, retry=retry)
+    failed = 0
+    loaded = False
+    try:
+        api.load_session(args.session)
+        loaded = True
+        # the client sends one request at a time, since every response
+        # rotates the token, so of the -j pages in flight one is being
+        # downloaded while the others are parsed
+        classes = api.get_my_classes_json(
+            load_external=args.load_external,
+            max_workers=args.concurrency)
+        if 'whoami' not in checkpoint:
+            emit('whoami', 'whoami', classes['whoami'])
+        todo = []
+        for class_json in classes['classes']:
+            class_id = class_json.get('class_id')
+            if class_id is None:
+                logging.warning(f'skipping a class without an ID: '
+                                f'{class_json.get("class_name")!r}')
+                continue
+            # key by key, so that classes added since the last run
+            # are written out too
+            if f'class/{class_id}' not in checkpoint:
+                emit(f'class/{class_id}', 'class', class_json)
+            if f'page/{class_id}' not in checkpoint:
+                todo.append(class_id)
+        logging.info(f'{len(todo)} class pages to go')
+
+        with concurrent.futures.ThreadPoolExecutor(
+                args.concurrency) as executor:
+            for class_id, future in _bounded(
+                    executor, api.get_class_page_json, todo,
+                    args.concurrency):
+                try:
+                    page = future.result()
+                except Exception as e:
+                    # leave it to the next run
+                    logging.error(f'class {class_id}: {e!r}')
+                    failed += 1
+                    continue
+                emit(f'page/{class_id}', 'class_page', page)
+    finally:
+        # not over a session file we couldn't read
+        if args.save and loaded:
+            api.save_session(args.session)
+        api.close()
+        checkpoint.close()
+        if out is not sys.stdout:
+            out.close()
+    # 1 tells a wrapper script that running again is worth it
+    return 1 if failed else 0
+
 
 parser = argparse.ArgumentParser(
     prog=shlex.join([sys.executable, '-m', __package__]),
     description='the ManageBac Swiss Army Knife')
+parser.add_argument('-v', '--verbose', action='count', default=0)
+commands = parser.add_subparsers(dest='command', required=True)
+
+crawl_parser = commands.add_parser(
+    'crawl', help='dump the class list and every class page as JSON Lines',
+    description='Fetch /student/classes/my and then every class page, '
+                'writing one JSON object per line as they come in.')
+crawl_parser.set_defaults(func=crawl)
+crawl_parser.add_argument('domain')
+crawl_parser.add_argument('-s', '--session', required=True,
+                          help='session file to take the token from')
+crawl_parser.add_argument('--save', action='store_true',
+                          help='write the rotated token back afterwards')
+crawl_parser.add_argument('--port', type=int)
+crawl_parser.add_argument('--protocol', choices=('http', 'https'),
+                          default='https')
+crawl_parser.add_argument('-o', '--output', default='-',
+                          help='where to write (default: stdout)')
+crawl_parser.add_argument('-c', '--checkpoint', metavar='FILE',
+                          help='remember progress here and skip what is '
+                               'already done when run again')
+crawl_parser.add_argument('-j', '--concurrency', type=int, default=4,
+                          help='class pages in flight; they are '
+                               'downloaded one at a time and parsed '
+                               'meanwhile (default: %(default)s)')
+crawl_parser.add_argument('--load-external', action='store_true',
+                          help='fetch class popovers too')
+crawl_parser.add_argument('--rate', type=float,
+                          help='at most this many requests per second')
+crawl_parser.add_argument('--burst', type=int, default=1)
+crawl_parser.add_argument('--retries', type=int, default=3,
+                          help='retries on errors (default: %(default)s)')
+
 args = parser.parse_args()
+logging.basicConfig(
+    level=logging.WARNING - 10 * args.verbose,
+    format='%(levelname)s %(name)s: %(message)s')
+sys.exit(args.func(args))
@@ -0,0 +1,296 @@
+"""asyncio flavor of the public API.
+
+this needs aiohttp (pip install mbapi[async]), which is why it is
+not imported by the package itself.
+"""
+import asyncio
+import functools
+import itertools
+import logging
+import time
+
+import aiohttp
+
+from . import metrics
+from .api import (
+    _StudentBase, _CLASSES_STRAINER, _check_html_type, _make_soup,
+    _popover_targets,
+    student_home_to_json, student_classes_to_json,
+    student_class_page_to_json,
+)
+
+
+__all__ = ['AsyncStudentAPI']
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncStudentAPI(_StudentBase):
+    """HTML scraper for student, but on an event loop.
+
+    All requests share one connection pool capped at `limit`
+    connections.  Parsing is CPU work and is therefore handed to
+    `executor` (the loop's default executor if None) so that a
+    slow page does not stall every other request in flight.
+    """
+
+    __slots__ = ('_session', '_limit', '_executor', '_sending')
+
+    def __init__(self, domain, port=None, protocol='https',
+                 limit=100, executor=None, parse_cache=None,
+                 features=None, partial=False, limiter=None, retry=None,
+                 records=False, recorder=None, popover_cache=None,
+                 lazy_sections=False):
+        super().__init__(domain, port, protocol, parse_cache, features,
+                         partial, limiter, retry, records, recorder,
+                         popover_cache, lazy_sections)
+        if not isinstance(limit, int):
+            raise TypeError('limit must be an int')
+        if limit < 0:
+            raise ValueError('limit must not be negative')
+        self._limit = limit
+        self._executor = executor
+        self._session = None
+        self._sending = None
+
+    def _ensure_session(self):
+        # aiohttp wants to be set up inside a running loop,
+        # so we can't do this in __init__
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._limit)
+            self._session = aiohttp.ClientSession(
+                connector=connector, trace_configs=[_trace_config()])
+            # every response rotates the token, so however many tasks
+            # share this client, one request is out at a time
+            self._sending = asyncio.Lock()
+        return self._session
+
+    async def __aenter__(self):
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, tb):
+        await self.close()
+        return None
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get(self, path, check=False, **kwargs):
+        """Make an HTTP GET request.  The body is read before
+        returning, so the connection is already back in the pool.
+        """
+        logger.info(f'GET {path}')
+        session = self._ensure_session()
+        url = self._url(path)
+        # _send() puts the token in once it is our turn
+        cookies = kwargs.pop('cookies', {})
+        old_token = self._token
+        stamps = {} if metrics.enabled() else None
+        timing = {}
+        response, body = await self._send(
+            session, url, timing, cookies=cookies, trace_request_ctx=stamps,
+            **kwargs)
+        done = time.perf_counter()
+        start = timing['start']
+        if self._recorder is not None:
+            self._recorder.record(
+                str(response.url), response.status,
+                response.headers.items(), body,
+                request_headers=response.request_info.headers.items(),
+                encoding=response.charset, elapsed=done - start)
+
+        if stamps is not None:
+            self._report_request(
+                path, response.status, len(body), old_token, done - start,
+                wait=timing['wait'], retry=timing['retry'],
+                **_phases(stamps, start, done))
+
+        if check:
+            response.raise_for_status()
+
+        return response
+
+    async def _send(self, session, url, timing, **kwargs):
+        """The asyncio twin of StudentAPI._send(), returning the
+        response and its body.
+        """
+        host = self._host()
+        stamps = kwargs.get('trace_request_ctx')
+        started = time.perf_counter()
+        waited = 0.0
+        for attempt in itertools.count():
+            turn = time.perf_counter()
+            for delay in self._turn(host):
+                await asyncio.sleep(delay)
+            try:
+                async with self._sending:
+                    start = time.perf_counter()
+                    waited += start - turn
+                    if stamps is not None:
+                        # only the last attempt's phases count
+                        stamps.clear()
+                    # the token of the response before us
+                    if self._token:
+                        kwargs['cookies']['_managebac_session'] = self._token
+                    async with session.get(url, **kwargs) as response:
+                        body = await response.read()
+                    for rawcookie in response.headers.getall('Set-Cookie',
+                                                             ()):
+                        self._set_cookie(rawcookie)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = self._after_attempt(host, attempt)
+                if delay is None:
+                    raise
+                logger.warning(f'{e!r}, retrying in {delay:.1f}s')
+            except BaseException:
+                # cancellation included
+                self._abandon(host)
+                raise
+            else:
+                delay = self._after_attempt(host, attempt, response.status,
+                                            response.headers)
+                if delay is None:
+                    timing.update(start=start, wait=waited,
+                                  retry=start - started - waited)
+                    return response, body
+                logger.warning(f'{response.status} for {url}, '
+                               f'retrying in {delay:.1f}s')
+            await asyncio.sleep(delay)
+
+    async def get_html(self, path, **kwargs):
+        response = await self.get(path, check=True, **kwargs)
+        return await _html_from_response(response)
+
+    async def _parse(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs))
+
+    async def get_home_page(self, check=True):
+        """GET HTTP request of the student's home page."""
+        return await self.get('/student/home', check=check)
+
+    async def get_home_page_html(self):
+        """Using get_home_page(), return the HTML text.
+        The response Content-Type is expected to be text/html.
+        """
+        response = await self.get_home_page()
+        return await _html_from_response(response)
+
+    async def whoami(self, fast=False):
+        """Return the current user, see student_home_to_json()."""
+        html_text = await self.get_home_page_html()
+        return await self._parse(
+            self._to_json, student_home_to_json, html_text, fast=fast)
+
+    async def get_my_classes(self, check=True):
+        """GET HTTP request for the student's classes."""
+        return await self.get('/student/classes/my', check=check)
+
+    async def get_my_classes_html(self):
+        """Using get_my_classes(), return the HTML text.
+        The response Content-Type is expected to be text/html.
+        """
+        response = await self.get_my_classes()
+        return await _html_from_response(response)
+
+    async def get_my_classes_json(self, load_external=False,
+                                  concurrency=8):
+        """Parse get_my_classes_html() into JSON.
+
+        If load_external, the popover of every class is fetched as
+        well.  They are downloaded one by one like every request of
+        ours, but up to `concurrency` of them are being parsed
+        meanwhile.  With a popover_cache, popovers fetched within its
+        ttl are not fetched again.
+        """
+        html_text = await self.get_my_classes_html()
+        if not load_external:
+            return await self._parse(
+                self._to_json, student_classes_to_json, html_text,
+                lazy_sections=self._lazy_sections)
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+
+        dom = await self._parse(
+            _make_soup, html_text, self._features,
+            _CLASSES_STRAINER if self._partial else None)
+        targets = _popover_targets(dom)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url):
+            popover_json = self._cached_popover(url)
+            if popover_json is not None:
+                return popover_json
+            async with semaphore:
+                popover_html = await self.get_html(url)
+            return await self._parse(self._parse_popover, url, popover_html)
+
+        # gather() keeps the order of its arguments
+        popovers = await asyncio.gather(*(fetch(url) for url in targets))
+        result = await self._parse(
+            student_classes_to_json, dom, features=self._features,
+            popovers=popovers, lazy_sections=self._lazy_sections)
+        return self._output(student_classes_to_json, result)
+
+    async def get_class_page(self, class_id, check=True):
+        """GET HTTP request for front page of a class."""
+        return await self.get(f'/student/classes/{class_id}', check=check)
+
+    async def get_class_page_html(self, class_id):
+        """Same as get_class_page(), but return the decoded string.
+        The response Content-Type is expected to be text/html.
+        """
+        response = await self.get_class_page(class_id)
+        return await _html_from_response(response)
+
+    async def get_class_page_json(self, class_id):
+        """Converts get_class_page_html() into JSON."""
+        page = await self.get_class_page_html(class_id)
+        return await self._parse(
+            self._to_json, student_class_page_to_json, page)
+
+
+def _trace_config():
+    trace = aiohttp.TraceConfig()
+    for signal, name in (
+            (trace.on_dns_resolvehost_start, 'dns_start'),
+            (trace.on_dns_resolvehost_end, 'dns_end'),
+            (trace.on_connection_create_start, 'connect_start'),
+            (trace.on_connection_create_end, 'connect_end'),
+            (trace.on_request_end, 'headers')):
+        signal.append(functools.partial(_stamp, name))
+    return trace
+
+
+async def _stamp(name, session, context, params):
+    # trace_request_ctx is None unless somebody is measuring
+    stamps = context.trace_request_ctx
+    if stamps is not None:
+        stamps[name] = time.perf_counter()
+
+
+def _phases(stamps, start, done):
+    """Turn the stamps from _trace_config() into the phases of a
+    request event.  dns and connect stay None when the connection
+    came out of the pool (or the host out of the DNS cache).
+    """
+    dns = connect = None
+    if 'dns_start' in stamps and 'dns_end' in stamps:
+        dns = stamps['dns_end'] - stamps['dns_start']
+    if 'connect_start' in stamps and 'connect_end' in stamps:
+        # resolving happens while connecting, don't count it twice
+        connect = (stamps['connect_end'] - stamps['connect_start']
+                   - (dns or 0))
+    headers = stamps.get('headers', done)
+    ttfb = headers - stamps.get('connect_end', start)
+    return dict(dns=dns, connect=connect, ttfb=ttfb,
+                download=done - headers)
+
+
+async def _html_from_response(r):
+    _check_html_type(r.headers['Content-Type'])
+    return await r.text()
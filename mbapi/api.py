@@ -1,15 +1,24 @@
 """public API."""
+import collections.abc
+import concurrent.futures
+import copy
 import datetime
-import http.cookies
+import functools
+import html
+import importlib.util
+import itertools
 import json
 import logging
 import re
+import sys
+import threading
+import time
 import urllib
 
-import bs4
-import requests
-
-from .util import parse_mime_header
+from . import metrics
+from .cache import cache_key, CachedResponse
+from .parse import Field, Schema, attr, text
+from .util import _from_epoch, parse_mime_header
 
 
 __all__ = ['StudentAPI']
@@ -17,6 +26,13 @@ __all__ = ['StudentAPI']
 logger = logging.getLogger(__name__)
 
 
+def _host_of(url):
+    """domain:port of url, the way _StudentBase._host() puts it."""
+    parts = urllib.parse.urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return f'{parts.hostname}:{port}'
+
+
 def _parse_id(prefix, ident):
     if not isinstance(ident, str):
         raise TypeError(f'ID should be a str, not {ident!r}')
@@ -31,16 +47,40 @@ def _parse_id(prefix, ident):
 def _sanitize(s):
     return urllib.parse.quote(s, safe=':')
 
-def _html_from_response(r):
-    mtype, params = parse_mime_header(r.headers['Content-Type'])
+def _check_html_type(content_type):
+    mtype, params = parse_mime_header(content_type)
     if mtype != 'text/html':
         raise ValueError(f'Expected Content-Type to be text/html, '
                          f'received {mtype!r}')
+
+def _html_from_response(r):
+    _check_html_type(r.headers['Content-Type'])
     return r.text
 
+_MONTHS = {month: i for i, month in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun',
+     'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), 1)}
+
+# both of the formats below, which is all anyone sends
+_EXPIRES = re.compile(r'[A-Za-z]{3}, (\d\d?)([ -])([A-Za-z]{3})\2(\d{4}) '
+                      r'(\d\d):(\d\d):(\d\d) GMT')
+
 # Python disposes %Z.... WHY
 # https://bugs.python.org/msg339672
+@functools.lru_cache(maxsize=64)
 def _parse_expires(s):
+    # strptime is slow, and slower still when the first format
+    # fails, so the usual dates are picked apart here
+    m = _EXPIRES.fullmatch(s)
+    month = m and _MONTHS.get(m.group(3).lower())
+    if month:
+        day, _, _, year, hour, minute, second = m.groups()
+        try:
+            return datetime.datetime(
+                int(year), month, int(day), int(hour), int(minute),
+                int(second), tzinfo=datetime.timezone.utc)
+        except ValueError:
+            pass
     try:
         # parse HTTP/1.1 "Expires" date, as per RFC2616 Section 14.21
         dt = datetime.datetime.strptime(s, '%a, %d %b %Y %H:%M:%S GMT')
@@ -56,15 +96,136 @@ _SECOND = datetime.timedelta(seconds=1)
 def _utc_now():
     return datetime.datetime.now(tz=datetime.timezone.utc)
 
-def _from_epoch(t):
-    return datetime.datetime.fromtimestamp(t, tz=datetime.timezone.utc)
-
 def _to_epoch(dt):
     if dt.microsecond:
         return dt.timestamp()
     return (dt - _EPOCH) // _SECOND
 
 
+# html.parser is always there but is pure Python.  lxml is a C
+# library and several times faster, so we take it when we can.
+# (finding it doesn't import it, and neither do we import bs4 before
+# the first parse: it takes longer to load than the rest of mbapi.)
+DEFAULT_FEATURES = ('lxml' if importlib.util.find_spec('lxml') is not None
+                    else 'html.parser')
+
+def _check_features(features):
+    import bs4
+    if features is not None and \
+            bs4.builder.builder_registry.lookup(features) is None:
+        raise ValueError(f'No HTML parser found for {features!r}')
+    return features
+
+def _is_bs4(obj, kind):
+    """isinstance(obj, bs4.<kind>), without importing bs4 to find out:
+    until somebody has, obj can't be one.
+    """
+    bs4 = sys.modules.get('bs4')
+    return bs4 is not None and isinstance(obj, getattr(bs4, kind))
+
+def _make_soup(html_text, features=None, parse_only=None):
+    import bs4
+    features = features or DEFAULT_FEATURES
+    if parse_only is None:
+        return bs4.BeautifulSoup(html_text, features=features)
+
+    if isinstance(parse_only, _Strainer):
+        parse_only = parse_only.build()
+    dom = bs4.BeautifulSoup(html_text, features=features,
+                            parse_only=parse_only)
+    # the strainer can't keep <body> without keeping everything in
+    # it, but _get_current_user() wants its attributes.  so we fish
+    # the start tag out of the text and give the DOM an empty copy.
+    match = RE_BODY_TAG.search(html_text)
+    if match is not None:
+        body = bs4.BeautifulSoup(match.group(0), features=features).body
+        if body is not None:
+            dom.append(body.extract())
+    return dom
+
+
+RE_BODY_TAG = re.compile(r'<body\b[^>]*>', flags=re.IGNORECASE)
+
+
+class _Strainer:
+    """A filter for parse_only= keeping every element that any of the
+    (name, CSS class, id) matchers accept, subtree and all.  None in
+    a matcher means "anything".  The bs4 object is only built by the
+    first parse that uses it, see _make_soup().
+    """
+
+    __slots__ = ('matchers', '_built')
+
+    def __init__(self, *matchers):
+        self.matchers = matchers
+        self._built = None
+
+    def match(self, name, attrs):
+        attrs = dict(attrs or ())
+        classes = attrs.get('class') or ()
+        if isinstance(classes, str):
+            classes = classes.split()
+        for m_name, m_class, m_id in self.matchers:
+            if m_name is not None and name != m_name:
+                continue
+            if m_class is not None and m_class not in classes:
+                continue
+            if m_id is not None and attrs.get('id') != m_id:
+                continue
+            return True
+        return False
+
+    def build(self):
+        # two threads may both build it, which does no harm
+        if self._built is None:
+            import bs4
+            if hasattr(bs4, 'ElementFilter'):
+                self._built = _element_filter()(self.match)
+            else:
+                # bs4 < 4.13 calls a function given as name with
+                # (name, attrs)
+                self._built = bs4.SoupStrainer(self.match)
+        return self._built
+
+
+@functools.lru_cache(maxsize=None)
+def _element_filter():
+    import bs4
+
+    # bs4 >= 4.13 only shows the name to a function given as name,
+    # and wants a subclass if attributes are to be looked at.
+    class _ElementFilter(bs4.ElementFilter):
+        def __init__(self, match):
+            super().__init__()
+            self._match = match
+
+        def allow_tag_creation(self, nsprefix, name, attrs):
+            return self._match(name, attrs)
+
+        def allow_string_creation(self, string):
+            return False
+
+    return _ElementFilter
+
+
+# what _get_current_user() reads (besides <body>, see _make_soup)
+_USER_PARTS = (
+    ('script', None, None),
+    ('title', None, None),
+    ('div', None, 'zendesk-widget'),
+    ('div', 'navbar-collapse', None),
+)
+
+# restricted parses for partial=True, one per extractor
+_HOME_STRAINER = _Strainer(*_USER_PARTS)
+_CLASSES_STRAINER = _Strainer(*_USER_PARTS, (None, None, 'classes'))
+_CLASS_PAGE_STRAINER = _Strainer(
+    *_USER_PARTS,
+    ('div', 'content-block', None),
+    ('section', 'js-members-section', None),
+)
+
+
 def _update_dict(old, new):
     """merge, but if there are conflicting values, turn value into list
     (assuming values are homogeneous)
@@ -85,15 +246,32 @@ def _update_dict(old, new):
                     old[key] = [old[key], value]
 
 
-class StudentAPI:
-    """HTML scraper for student"""
+# one NAME=VALUE and its attributes, out of a Set-Cookie header or
+# several of them folded together with commas.  expires is the one
+# attribute with a comma in it, so it is matched by its shape.
+_SET_COOKIE = re.compile(
+    r'\s*([^=;,\s]+)\s*=\s*("?)([^";,\s]*)\2\s*'
+    r'((?:;\s*(?:[Ee][Xx][Pp][Ii][Rr][Ee][Ss]\s*=\s*[A-Za-z]+,[^;,]*'
+    r'|[^;,]*))*)(?:,|\Z)')
+_COOKIE_EXPIRES = re.compile(r';\s*expires\s*=\s*([^;]+)', re.IGNORECASE)
+
+
+class _StudentBase:
+    """state shared between the blocking and the asyncio client:
+    where to connect, and the session token we carry around.
+    """
 
     __slots__ = (
-        '_protocol', '_domain', '_port', '_session',
-        '_token', '_expires',
+        '_protocol', '_domain', '_port',
+        '_token', '_expires', '_parse_cache', '_features', '_partial',
+        '_limiter', '_retry', '_records', '_recorder', '_popover_cache',
+        '_lazy_sections',
     )
 
-    def __init__(self, domain, port=None, protocol='https'):
+    def __init__(self, domain, port=None, protocol='https',
+                 parse_cache=None, features=None, partial=False,
+                 limiter=None, retry=None, records=False, recorder=None,
+                 popover_cache=None, lazy_sections=False):
         self._domain = _sanitize(domain)
         self._protocol = protocol
         if protocol not in {'http', 'https'}:
@@ -105,9 +283,25 @@ class StudentAPI:
         if not 0 <= port <= 65535:
             raise ValueError('port must be in range 0-65535')
         self._port = port
-        self._session = requests.sessions.Session()
         self._token = None
         self._expires = None
+        # a mbapi.memo.ParseCache, if you want one
+        self._parse_cache = parse_cache
+        self._features = _check_features(features)
+        # build only the parts of each page we read
+        self._partial = partial
+        # a mbapi.throttle.RateLimiter and RetryPolicy, if you want
+        # them; share them between clients of the same server
+        self._limiter = limiter
+        self._retry = retry
+        # hand out mbapi.records objects instead of dicts
+        self._records = records
+        # a mbapi.archive.ArchiveRecorder keeping every response
+        self._recorder = recorder
+        # a mbapi.cache.PopoverCache for load_external
+        self._popover_cache = popover_cache
+        # see student_classes_to_json()
+        self._lazy_sections = lazy_sections
 
     def load_session(self, file):
         with open(file, encoding='ascii') as fp:
@@ -127,13 +321,6 @@ class StudentAPI:
             json.dump(session, fp)
         return session
 
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc_val, tb):
-        self._session.close()
-        return None
-
     @property
     def token(self):
         """ManageBac session token.  Must be provided verbatim from
@@ -148,8 +335,6 @@ class StudentAPI:
     @token.setter
     def token(self, token):
         self._token = token
-        if token:
-            self._session.cookies.set('_managebac_session', token)
 
     @property
     def expires(self):
@@ -167,39 +352,298 @@ class StudentAPI:
             return True
         return self._expires > (now or _utc_now())
 
+    def _to_json(self, func, html_text, **kwargs):
+        kwargs.update(features=self._features, partial=self._partial)
+        if self._parse_cache is None:
+            result = func(html_text, **kwargs)
+        else:
+            result = self._parse_cache.parse(func, html_text, **kwargs)
+        return self._output(func, result)
+
+    def _output(self, func, result):
+        if not self._records:
+            return result
+        from .records import convert
+        return convert(func, result)
+
+    def _cached_popover(self, url):
+        if self._popover_cache is None:
+            return None
+        # absolute, as one cache may serve clients of several schools
+        return self._popover_cache.get(self._url(url))
+
+    def _parse_popover(self, url, popover_html):
+        popover_json = class_popover_to_json(popover_html, self._features)
+        if self._popover_cache is not None:
+            self._popover_cache.put(self._url(url), popover_json)
+        return popover_json
+
+    def _url(self, path):
+        base = f'{self._protocol}://{self._domain}:{self._port}'
+        return urllib.parse.urljoin(base, path)
+
+    def _host(self):
+        return f'{self._domain}:{self._port}'
+
+    def _turn(self, host):
+        """Yield how long to sleep, again and again, until it is our
+        turn to talk to host.
+        """
+        if self._retry is not None:
+            while True:
+                delay = self._retry.wait(host)
+                if delay <= 0:
+                    break
+                logger.debug(f'circuit open for {host}, waiting {delay:.1f}s')
+                yield delay
+        if self._limiter is not None:
+            delay = self._limiter.reserve(host)
+            if delay > 0:
+                yield delay
+
+    def _after_attempt(self, host, attempt, status=None, headers=None):
+        """Tell the retry policy how an attempt went (status None for
+        a connection error) and return how long to sleep before
+        trying again, or None if we shouldn't.
+        """
+        retry = self._retry
+        if retry is None:
+            return None
+        failed = status is None or retry.retryable(status)
+        retry.record(host, not failed)
+        if not failed or attempt + 1 >= retry.attempts:
+            return None
+        delay = retry.delay(attempt, headers)
+        if status == 429 and self._limiter is not None:
+            # too many requests is about all of us, not just this one
+            self._limiter.pause(host, delay)
+        return delay
+
+    def _abandon(self, host):
+        """An attempt died of something we don't retry on.  The
+        breaker still has to hear of it: if it was the probe, nobody
+        else would be let through ever again.
+        """
+        if self._retry is not None:
+            self._retry.record(host, False)
+
+    def _report_request(self, path, status, size, old_token, total,
+                        ttfb=None, download=None, dns=None, connect=None,
+                        wait=None, retry=None, from_cache=False):
+        metrics.emit('request', path=path, route=metrics.route(path),
+                     status=status, bytes=size, dns=dns, connect=connect,
+                     ttfb=ttfb, download=download, total=total, wait=wait,
+                     retry=retry, cookie_refreshed=self._token != old_token,
+                     from_cache=from_cache)
+
+    def _set_cookie(self, rawcookie):
+        # we only ever want the one cookie, so rather than have
+        # SimpleCookie parse everything, step from cookie to cookie.
+        # only the name at the start of each counts: a
+        # _managebac_session=... after a ; is some other cookie's
+        # attribute
+        token = None
+        pos = 0
+        while pos < len(rawcookie):
+            cookie = _SET_COOKIE.match(rawcookie, pos)
+            if cookie is None:
+                # rather than guess where the next cookie starts
+                break
+            if cookie.group(1) == '_managebac_session':
+                token = cookie
+            pos = cookie.end()
+        if token is not None:
+            self.token = token.group(3)
+            expires = _COOKIE_EXPIRES.search(token.group(4))
+            if expires is not None:
+                self.expires = _parse_expires(expires.group(1).strip())
+
+
+class StudentAPI(_StudentBase):
+    """HTML scraper for student"""
+
+    __slots__ = ('_session', '_shared', '_cache', 'identity', '_sending')
+
+    def __init__(self, domain, port=None, protocol='https', cache=None,
+                 parse_cache=None, features=None, partial=False,
+                 limiter=None, retry=None, adapter=None, records=False,
+                 recorder=None, popover_cache=None, identity=None,
+                 lazy_sections=False):
+        super().__init__(domain, port, protocol, parse_cache, features,
+                         partial, limiter, retry, records, recorder,
+                         popover_cache, lazy_sections)
+        # requests is only imported once a client is made, so that
+        # a process that just parses doesn't have to load it
+        import requests.sessions
+        self._session = requests.sessions.Session()
+        # a requests HTTPAdapter shared with other clients, so that
+        # they draw on one connection pool while each keeps its own
+        # cookies.  whoever made it closes it, not us
+        self._shared = adapter is not None
+        if adapter is not None:
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+        # a mbapi.cache.ResponseCache, if you want one.
+        #
+        # entries are kept apart per identity: anything stable that
+        # tells accounts apart (a user ID, an account name, ...).
+        # the token won't do, it rotates on every response.  left
+        # as None, it becomes our user ID on the first cached get()
+        self._cache = cache
+        self.identity = identity
+        # every response rotates the token, so however many threads
+        # share this client, one request is out at a time
+        self._sending = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+        return None
+
+    def close(self):
+        if not self._shared:
+            self._session.close()
+
+    @_StudentBase.token.setter
+    def token(self, token):
+        self._token = token
+        if token:
+            self._session.cookies.set('_managebac_session', token)
+
     def get(self, path, check=False, **kwargs):
         """Make an HTTP GET request."""
+        return self._get(path, check, self._cache, **kwargs)
+
+    def _cache_identity(self):
+        if self.identity is None:
+            # one uncached look at the home page to learn who we are
+            response = self._get('/student/home', True, None)
+            user = student_home_to_json(_html_from_response(response),
+                                        self._features, fast=True)
+            if user.get('user_id') is None:
+                raise ValueError('cannot tell who we are to key the '
+                                 'cache; set identity')
+            self.identity = user['user_id']
+        return self.identity
+
+    def _get(self, path, check, cache, session=None, **kwargs):
+        """get(), but with a cache of choice.  A requests session
+        given here is used instead of ours, see _send().
+        """
         logger.info(f'GET {path}')
-        base = f'{self._protocol}://{self._domain}:{self._port}'
-        url = urllib.parse.urljoin(base, path)
-        response = self._session.get(url, **kwargs)
-
-        # update our cookies
-        try:
-            self._set_cookie(response.headers['Set-Cookie'])
-        except KeyError:
-            pass
+        url = self._url(path)
+        measure = metrics.enabled()
+
+        entry = None
+        if cache is not None:
+            key = cache_key(self._cache_identity(), url)
+            entry = cache.get(key)
+            if entry is not None:
+                if entry.is_fresh(cache.ttl):
+                    logger.debug(f'cache hit for {path}')
+                    if measure:
+                        self._report_request(
+                            path, entry.status, len(entry.content),
+                            self._token, 0.0, from_cache=True)
+                    return entry.to_response()
+                kwargs['headers'] = {**entry.validators(),
+                                     **kwargs.get('headers', {})}
+
+        old_token = self._token
+        timing = {}
+        response = self._send(url, timing, session, **kwargs)
+        total = time.perf_counter() - timing['start']
+        if self._recorder is not None:
+            self._recorder.record_response(response)
+
+        if cache is not None:
+            if entry is not None and response.status_code == 304:
+                logger.debug(f'{path} not modified')
+                entry.revalidated(response)
+                cache.put(key, entry)
+                response = entry.to_response()
+            elif response.status_code == 200:
+                cache.put(key, CachedResponse.from_response(response))
+
+        if measure:
+            # requests can't tell DNS and connecting apart from waiting
+            # for the server; elapsed is everything up to the headers
+            ttfb = response.elapsed.total_seconds()
+            self._report_request(
+                path, response.status_code, len(response.content),
+                old_token, total, ttfb=ttfb, download=max(0, total - ttfb),
+                wait=timing['wait'], retry=timing['retry'],
+                from_cache=entry is not None and response.status_code == 304)
 
         if check:
             response.raise_for_status()
 
         return response
 
+    def _send(self, url, timing, session=None, **kwargs):
+        """GET url once it's our turn, retrying as the retry policy
+        says.  The last response is returned whatever its status.
+
+        timing gets when the last attempt started, and how long was
+        spent before it waiting for our turn and on earlier attempts
+        (wait and retry, in seconds).
+
+        With a session of its own, url is somebody else's: it is
+        throttled by its own host, and the token neither goes there
+        nor is taken from what comes back.
+        """
+        import requests
+
+        host = self._host() if session is None else _host_of(url)
+        started = time.perf_counter()
+        waited = 0.0
+        for attempt in itertools.count():
+            turn = time.perf_counter()
+            for delay in self._turn(host):
+                time.sleep(delay)
+            try:
+                start, response = self._attempt(url, session, **kwargs)
+                waited += start - turn
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = self._after_attempt(host, attempt)
+                if delay is None:
+                    raise
+                logger.warning(f'{e!r}, retrying in {delay:.1f}s')
+            except BaseException:
+                self._abandon(host)
+                raise
+            else:
+                delay = self._after_attempt(host, attempt,
+                                            response.status_code,
+                                            response.headers)
+                if delay is None:
+                    timing.update(start=start, wait=waited,
+                                  retry=start - started - waited)
+                    return response
+                logger.warning(f'{response.status_code} for {url}, '
+                               f'retrying in {delay:.1f}s')
+            time.sleep(delay)
+
+    def _attempt(self, url, session, **kwargs):
+        """One GET for _send(); when it started, and the response."""
+        if session is not None:
+            return time.perf_counter(), session.get(url, **kwargs)
+        with self._sending:
+            start = time.perf_counter()
+            response = self._session.get(url, **kwargs)
+            # update our cookies before the next one goes out
+            try:
+                self._set_cookie(response.headers['Set-Cookie'])
+            except KeyError:
+                pass
+        return start, response
+
     def get_html(self, path, **kwargs):
         response = self.get(path, check=True, **kwargs)
         return _html_from_response(response)
 
-    def _set_cookie(self, rawcookie):
-        # cookie jar https://stackoverflow.com/a/21522721
-        cookie = http.cookies.SimpleCookie()
-        cookie.load(rawcookie)
-        token = cookie.get('_managebac_session')
-        if isinstance(token, http.cookies.Morsel):
-            self.token = token.value
-            expires = token.get('expires')
-            if isinstance(expires, str):
-                self.expires = _parse_expires(expires)
-
     def get_home_page(self, check=True):
         """GET HTTP request of the student's home page."""
         return self.get('/student/home', check=check)
@@ -214,10 +658,10 @@ class StudentAPI:
     # there is no get_home_page_json as the data displayed
     # there can be easily retrieved elsewhere
 
-    def whoami(self):
+    def whoami(self, fast=False):
+        """Return the current user, see student_home_to_json()."""
         html_text = self.get_home_page_html()
-        dom = bs4.BeautifulSoup(html_text, features='html.parser')
-        return _get_current_user(dom)
+        return self._to_json(student_home_to_json, html_text, fast=fast)
 
     def get_my_classes(self, check=True):
         """GET HTTP request for the student's classes."""
@@ -233,26 +677,44 @@ class StudentAPI:
         response = self.get_my_classes()
         return _html_from_response(response)
 
-    def get_my_classes_json(self, load_external=False):
+    def get_my_classes_json(self, load_external=False, max_workers=8):
+        """Parse get_my_classes_html() into JSON.
+
+        If load_external, the popover of every class is fetched as
+        well.  They are downloaded one by one like every request of
+        ours, but parsed by up to max_workers threads meanwhile.
+        With a popover_cache, popovers fetched within its ttl are
+        not fetched again.
+        """
         html_text = self.get_my_classes_html()
-        dom = bs4.BeautifulSoup(html_text, features='html.parser')
-        if load_external:
-            classes = dom.select_one('#classes')
-            for div in classes.find_all('div', recursive=None):
-                banner = div.select_one('h4.title')
-                popover_icon = div.select_one('span.fusion-popover')
-                popover_url = popover_icon['data-hint-url']
-                popover_html = self.get_html(popover_url)
-                popover_dom = bs4.BeautifulSoup(
-                    popover_html, features='html.parser')
-
-                popover_div = dom.new_tag('div',
-                                          attrs={'class': ['popover'],
-                                                 'hidden': None})
-                for elem in popover_dom.children:
-                    popover_div.append(elem)
-                banner.append(popover_div)
-        return student_classes_to_json(dom)
+        if not load_external:
+            return self._to_json(student_classes_to_json, html_text,
+                                 lazy_sections=self._lazy_sections)
+
+        dom = _make_soup(html_text, self._features,
+                         _CLASSES_STRAINER if self._partial else None)
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        targets = _popover_targets(dom)
+        popovers = [self._cached_popover(url) for url in targets]
+        missing = [i for i, popover in enumerate(popovers) if popover is None]
+        if missing:
+            def fetch(i):
+                url = targets[i]
+                return self._parse_popover(url, self.get_html(url))
+
+            with concurrent.futures.ThreadPoolExecutor(
+                    max_workers=min(max_workers, len(missing))
+            ) as executor:
+                # map() hands results back in submission order,
+                # so every popover still lands on its own class
+                for i, popover_json in zip(missing,
+                                           executor.map(fetch, missing)):
+                    popovers[i] = popover_json
+        return self._output(student_classes_to_json,
+                            student_classes_to_json(
+                                dom, self._features, popovers=popovers,
+                                lazy_sections=self._lazy_sections))
 
     def get_class_page(self, class_id, check=True):
         """GET HTTP request for front page of a class."""
@@ -268,50 +730,197 @@ class StudentAPI:
     def get_class_page_json(self, class_id):
         """Converts get_class_page_html() into HTML."""
         page = self.get_class_page_html(class_id)
-        return student_class_page_to_json(page)
+        return self._to_json(student_class_page_to_json, page)
+
+
+def _popover_targets(dom):
+    """list of the popover URL of every class in #classes, in the
+    order student_classes_to_json() lists them.
+    """
+    classes = dom.select_one('#classes')
+    return [_POPOVER_TARGET.extract(div)['url']
+            for div in classes.find_all('div', recursive=False)]
+
+
+_POPOVER_TARGET = Schema(
+    url=Field('span.fusion-popover', get=attr('data-hint-url')),
+)
+
+
+_POPOVER = Schema(
+    subject=Field('dd.subject', get=text(strip=True)),
+    teachers=Field('dd.teachers ul li', many=True, get=text(strip=True)),
+    students=Field('dd.students', get=text(strip=True)),
+)
+
+
+def class_popover_to_json(popover_html, features=None):
+    """Parse the popover of a class (its data-hint-url) into the
+    fields it adds to the class:
+    class_subject, class_teachers (names only) and
+    class_student_count.
+    """
+    if _is_bs4(popover_html, 'Tag'):
+        dom = popover_html
+    else:
+        dom = _make_soup(popover_html, features)
+    parts = _POPOVER.extract(dom)
+    popover_json = {}
+    if parts['subject']:
+        popover_json['class_subject'] = parts['subject']
+    if parts['teachers']:
+        popover_json['class_teachers'] = [
+            parse_user_name(name) for name in parts['teachers'] if name]
+    students = parts['students']
+    if students is not None and students.isdigit():
+        popover_json['class_student_count'] = int(students)
+    return popover_json
+
+
+def student_home_to_json(html_text, features=None, partial=False,
+                         fast=False):
+    """Identify the current user from any page, though the
+    home page is the cheapest one to ask for.
+
+    If partial, only the few elements this looks at are built into
+    the DOM, which is faster and leaner.  The same goes for the other
+    *_to_json functions.
+
+    If fast, try scanning the text for what we need first, and only
+    build a DOM if that doesn't work out.  The result is the same.
+
+    Like the other *_to_json functions, this takes a DOM you have
+    already built in place of the text, too.
+    """
+    started = _clock()
+    if _is_bs4(html_text, 'BeautifulSoup'):
+        user = _get_current_user(html_text)
+        _report_parse('student_home_to_json', html_text, started)
+        return user
+
+    if fast:
+        user = _scan_current_user(html_text)
+        if user is not None:
+            _report_parse('student_home_to_json', html_text, started)
+            return user
+        logger.debug('fast path failed, falling back to the DOM')
+
+    dom = _make_soup(html_text, features,
+                     _HOME_STRAINER if partial else None)
+    built = _clock()
+    user = _get_current_user(dom)
+    _report_parse('student_home_to_json', html_text, started, built)
+    return user
+
 
+def _clock():
+    # only bother with the time if somebody wants it
+    return time.perf_counter() if metrics.enabled() else None
 
-def student_classes_to_json(html_text):
-    if isinstance(html_text, bs4.BeautifulSoup):
+
+def _report_parse(function, html_text, started, built=None):
+    """Emit a parse event; built is None when no DOM was built."""
+    if started is None:
+        return
+    now = time.perf_counter()
+    metrics.emit(
+        'parse', function=function,
+        bytes=(None if _is_bs4(html_text, 'BeautifulSoup')
+               else len(html_text)),
+        build=None if built is None else built - started,
+        extract=now - (started if built is None else built))
+
+
+def student_classes_to_json(html_text, features=None, partial=False,
+                            popovers=None, lazy_sections=False):
+    """popovers is a list of the parsed popovers of the classes (see
+    class_popover_to_json), in the order of the page, as
+    load_external gets them; None for a class without one.
+
+    If lazy_sections, the units, tasks and updates of a class are
+    LazySection views, only parsed once somebody looks at them,
+    instead of lists.  They aren't JSON serializable by themselves,
+    see mbapi.util.json_default.
+    """
+    started = _clock()
+    if _is_bs4(html_text, 'BeautifulSoup'):
         dom = html_text
+        built = None
     else:
-        dom = bs4.BeautifulSoup(html_text, features='html.parser')
+        dom = _make_soup(html_text, features,
+                         _CLASSES_STRAINER if partial else None)
+        built = _clock()
     response = {}
     response['whoami'] = _get_current_user(dom)
 
+    # lazy sections are cut out of a DOM we built ourselves, so that
+    # holding on to them doesn't mean holding on to the whole page
+    lazy = lazy_sections
+    detach = lazy and not _is_bs4(html_text, 'BeautifulSoup')
+
     response['classes'] = classes = []
-    for div in dom.select_one('#classes').find_all('div', recursive=False):
+    for i, div in enumerate(
+            dom.select_one('#classes').find_all('div', recursive=False)):
         class_json = {}
         try:
             class_json['class_id'] = _parse_id('ib_class', div['id'])
         except (KeyError, ValueError):
             pass
 
-        info_div = div.select_one('div.ib-class-row')
-        _update_class_info(class_json, info_div)
+        parts = _CLASS_DIV.extract(div)
+        popover_json = None
+        if popovers is not None and i < len(popovers):
+            popover_json = popovers[i]
+        _update_class_info(class_json, parts['info'], features, popover_json)
 
-        unit_div = div.select_one('div.units-container')
+        unit_div = parts['units']
         if unit_div and unit_div.children:
-            _update_class_units(class_json, unit_div)
+            _update_class_units(class_json, unit_div, lazy, detach)
 
-        task_div = div.select_one('div.tasks-container')
+        task_div = parts['tasks']
         if task_div and task_div.contents:
-            _update_class_tasks(class_json, task_div)
+            _update_class_tasks(class_json, task_div, lazy, detach)
 
-        upds_div = div.select_one('div.updates-container')
+        upds_div = parts['updates']
         if upds_div and upds_div.contents:
-            _update_class_updates(class_json, upds_div)
+            _update_class_updates(class_json, upds_div, lazy, detach)
 
         classes.append(class_json)
+    _report_parse('student_classes_to_json', html_text, started, built)
     return response
 
 
-def _update_class_info(class_json, div):
-    icon = div.select_one('img.sebo-icon')
-    class_json['class_icon'] = icon['src']
+_CLASS_DIV = Schema(
+    info=Field('div.ib-class-row'),
+    units=Field('div.units-container'),
+    tasks=Field('div.tasks-container'),
+    updates=Field('div.updates-container'),
+)
+
+_CLASS_INFO = Schema(
+    icon=Field('img.sebo-icon', get=attr('src')),
+    title=Field('h4.title a'),
+    dropdown=Field('div.class-dropdown'),
+)
+
+# asked of the first dropdown only, and the jackpot of its first
+# div.flex-start only, as select_one() used to
+_CLASS_DROPDOWN = Schema(
+    stats=Field('div.class-dropdown-item', many=True,
+                get=Schema(number=Field('div.number', get=text()),
+                           text=Field('div.text', get=text()))),
+    teachers=Field('div.flex-start'),
+)
+_JACKPOT = Schema(jackpot=Field('span.user-link > div', get=attr('data-hint')))
+
+_AVATAR = Schema(avatar=Field('div.avatar'))
+
 
-    banner = div.select_one('h4.title')
-    title = banner.a
+def _update_class_info(class_json, div, features=None, popover_json=None):
+    info = _CLASS_INFO.extract(div)
+    class_json['class_icon'] = info['icon']
+
+    title = info['title']
     # if you see the 2 on a separate line and want to
     # know why..... i don't know either. but it COULD be
     # their way of dealing with the same course,
@@ -322,12 +931,12 @@ def _update_class_info(class_json, div):
     class_json['class_url'] = title['href']
 
     # get # units, # tasks, # updates from the dropdown menu
-    dropdown = div.select_one('div.class-dropdown')
+    dropdown = {'stats': (), 'teachers': None}
+    if info['dropdown'] is not None:
+        dropdown = _CLASS_DROPDOWN.extract(info['dropdown'])
     stats = {}
-    for item in dropdown.select('div.class-dropdown-item'):
-        val = item.select_one('div.number').text
-        cat = item.select_one('div.text').text
-        stats[cat.lower()] = val
+    for item in dropdown['stats']:
+        stats[item['text'].lower()] = item['number']
     if stats:
         class_json['class_stats'] = stats
 
@@ -335,25 +944,24 @@ def _update_class_info(class_json, div):
     # like the sidebar we've dealt with in student_class_page_to_json().
     #
     # this, unfortunately, does not have a very descriptive name.
-    teachers = dropdown.select_one('div.flex-start')
+    teachers = dropdown['teachers']
     if teachers is not None:
         # let's see if we hit the jackpot - this giant pop-up
         # HTML seems to appear in the data-hint attribute, which
         # we will parse that instead as it has the complete list.
         # (again, the class name makes no sense.)
-        jackpot = teachers.select_one('span.user-link > div')
-        if jackpot is not None:
-            value = jackpot['data-hint']
-            teaches = bs4.BeautifulSoup(value, features='html.parser').table
+        value = _JACKPOT.extract(teachers)['jackpot']
+        if value is not None:
+            teaches = _make_soup(value, features).table
         else:
             teaches = teachers
 
         teacher_list = []
         for teach in teaches.children:
-            if not isinstance(teach, bs4.Tag):
+            if not _is_bs4(teach, 'Tag'):
                 continue
             teacher_json = {}
-            avatar = teach.select_one('div.avatar')
+            avatar = _AVATAR.extract(teach)['avatar']
             # and yes, somehow you get 'span's on the outside
             # while the pop-up HTML uses a table of rows of 'div's.
             # (i am actually losing my sanity over weird s**t like this)
@@ -378,47 +986,195 @@ def _update_class_info(class_json, div):
 
     # if load_external was set to True, we may scrape from the
     # popover box the teachers, the subject, and # of students
-    popover = banner.select_one('div.popover')
-    if popover:
-        # ... although that is yet to be implemented now.
-        pass
+    if popover_json is not None:
+        _update_class_popover(class_json, popover_json)
+
+
+def _update_class_popover(class_json, popover_json):
+    for key in ('class_subject', 'class_student_count'):
+        if key in popover_json:
+            class_json[key] = popover_json[key]
+    # the popover only has names, but it has all of them, while the
+    # dropdown may stop after the first few.  add whoever is missing
+    teachers = class_json.setdefault('class_teachers', [])
+    known = {teacher.get('user_name') for teacher in teachers}
+    for teacher in popover_json.get('class_teachers', ()):
+        if teacher['user_name'] not in known:
+            teachers.append(teacher)
+            known.add(teacher['user_name'])
+    if not teachers:
+        del class_json['class_teachers']
+
+
+def _update_class_units(class_json, div, lazy=False, detach=False):
+    class_json['class_units'] = _section(div, 'unit', lazy, detach)
+
+
+def _update_class_tasks(class_json, div, lazy=False, detach=False):
+    class_json['class_tasks'] = _section(div, 'task', lazy, detach)
+
+
+def _update_class_updates(class_json, div, lazy=False, detach=False):
+    class_json['class_updates'] = _section(div, 'update', lazy, detach)
 
 
-def _update_class_units(class_json, div):
-    pass
+def _section(div, prefix, lazy, detach):
+    if lazy:
+        return LazySection(div, prefix, detach)
+    return _parse_section(div, prefix)
 
 
-def _update_class_tasks(class_json, div):
-    pass
+class LazySection(collections.abc.Sequence):
+    """The items of a units, tasks or updates container, parsed the
+    first time anybody looks at them.  Until then only the subtree
+    is kept, and after that only the items.
 
+    It behaves like a (read-only) list; copying or pickling one
+    gives a plain list, and mbapi.util.json_default makes json.dump()
+    write it as one.  A deep copy of one not parsed yet is another
+    unparsed view of the same subtree, which parsing only reads.
+    """
+
+    __slots__ = ('_div', '_prefix', '_items')
 
-def _update_class_updates(class_json, div):
-    pass
+    def __init__(self, div, prefix, detach=False):
+        self._div = div.extract() if detach else div
+        self._prefix = prefix
+        self._items = None
 
+    def _load(self):
+        items = self._items
+        if items is None:
+            items = self._items = _parse_section(self._div, self._prefix)
+            self._div = None
+        return items
 
-def student_class_page_to_json(html_text):
-    dom = bs4.BeautifulSoup(html_text, features='html.parser')
+    @property
+    def loaded(self):
+        return self._items is not None
+
+    def __getitem__(self, index):
+        return self._load()[index]
+
+    def __len__(self):
+        return len(self._load())
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __eq__(self, other):
+        if isinstance(other, (LazySection, list)):
+            return self._load() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        if self._items is None:
+            return f'<{type(self).__name__} of {self._prefix}s, not parsed>'
+        return repr(self._items)
+
+    def __copy__(self):
+        return list(self._load())
+
+    def __deepcopy__(self, memo):
+        # _load() sets _items before it drops _div, so this holds
+        # even if another thread is parsing us right now
+        div = self._div
+        if div is None:
+            return copy.deepcopy(self._items, memo)
+        # so that a ParseCache hit doesn't parse every section
+        clone = LazySection.__new__(LazySection)
+        clone._div = div
+        clone._prefix = self._prefix
+        clone._items = None
+        return clone
+
+    def __reduce__(self):
+        return list, (self._load(),)
+
+
+_SECTION_ITEM = Schema(
+    link=Field('a[href]'),
+    time=Field('time'),
+    label=Field('.label', get=text(strip=True)),
+)
+
+RE_TRAILING_ID = re.compile(r'/(\d+)/?(?:[?#].*)?\Z')
+
+def _parse_section(div, prefix):
+    """every child of a container with a link in it is an item:
+    the link says what it is and where, and a <time> (due dates,
+    start dates, posting dates...) and a .label, if any, say when
+    and what kind.  i haven't seen enough of these containers to
+    say there isn't more in there, but this is what's dependable.
+    """
+    items = []
+    for child in div.find_all(True, recursive=False):
+        parts = _SECTION_ITEM.extract(child)
+        link = parts['link']
+        if link is None:
+            continue
+        item_json = {}
+        match = RE_TRAILING_ID.search(link['href'])
+        if match is not None:
+            item_json[f'{prefix}_id'] = match.group(1)
+        item_json[f'{prefix}_title'] = link.text.strip()
+        item_json[f'{prefix}_url'] = link['href']
+        if parts['label']:
+            item_json[f'{prefix}_type'] = parts['label']
+        time_tag = parts['time']
+        if time_tag is not None:
+            item_json[f'{prefix}_date'] = (time_tag.get('datetime')
+                                           or time_tag.text.strip())
+        items.append(item_json)
+    return items
+
+
+_CLASS_PAGE = Schema(
+    content=Field('div.content-block'),
+    section=Field('section.js-members-section'),
+)
+
+# the first list of each, as select_one() used to
+_MEMBERS = Schema(
+    teachers=Field('div.teachers-list'),
+    students=Field('div.students-list'),
+)
+_MEMBER_LIST = Schema(members=Field('div.member', many=True))
+
+
+def student_class_page_to_json(html_text, features=None, partial=False):
+    started = _clock()
+    if _is_bs4(html_text, 'BeautifulSoup'):
+        dom = html_text
+        built = None
+    else:
+        dom = _make_soup(html_text, features,
+                         _CLASS_PAGE_STRAINER if partial else None)
+        built = _clock()
     response = {}
     response['whoami'] = _get_current_user(dom)
 
-    content = dom.select_one('div.content-block')
-    response['class'] = _get_class_basic_info(content)
+    page = _CLASS_PAGE.extract(dom)
+    response['class'] = _get_class_basic_info(page['content'])
 
-    section = dom.select_one('section.js-members-section')
-    teachers = section.select_one('div.teachers-list')
-    if teachers is not None:
+    members = _MEMBERS.extract(page['section'])
+    if members['teachers'] is not None:
         list_t = [parse_teacher_element(div) for div
-                  in teachers.select('div.member')]
+                  in _MEMBER_LIST.extract(members['teachers'])['members']]
     else:
         list_t = None
 
-    students = section.select_one('div.students-list')
-    list_s = [parse_student_element(div) for div
-              in students.select('div.member')]
+    list_s = []
+    if members['students'] is not None:
+        list_s = [parse_student_element(div) for div
+                  in _MEMBER_LIST.extract(members['students'])['members']]
 
     response['teachers'] = list_t
     response['students'] = list_s
 
+    _report_parse('student_class_page_to_json', html_text, started, built)
     return response
 
 
@@ -456,11 +1212,52 @@ RE_LOU_ID = re.compile(
     r'LOU\.identify\(\'(\d+)\', (\{.+\})\)\s+\}\Z', flags=re.DOTALL)
 
 
+_CURRENT_USER = Schema(
+    scripts=Field('script', many=True, get=text()),
+    zendesk=Field('div#zendesk-widget'),
+    navbar=Field('div.navbar.navbar-collapse'),
+)
+
+# asked of the first navbar only, and the avatar of its first
+# profile link only, as select_one() used to
+_NAVBAR = Schema(profile=Field('div.profile-link'))
+
+
 def _get_current_user(dom):
+    parts = _CURRENT_USER.extract(dom)
+    # the CDATA is most likely in one of the last scripts
+    scripts = reversed(parts['scripts'])
+    zendesk = parts['zendesk']
+    body = dom.body
+    assert body is not None
+    # (a partial DOM has no <head>, only the <title> itself)
+    title = (dom.head or dom).title
+
+    avatar = None
+    navbar = parts['navbar']
+    if navbar is not None:
+        # a navbar without a profile link, or a profile link without
+        # an avatar, is a page we don't understand: fail
+        profile = _NAVBAR.extract(navbar)['profile']
+        avatar = parse_user_avatar(_AVATAR.extract(profile)['avatar'])
+
+    return _merge_current_user(
+        scripts,
+        zendesk.attrs if zendesk is not None else None,
+        body.attrs,
+        title.text if title is not None else None,
+        avatar)
+
+
+def _merge_current_user(scripts, zendesk, body, title, avatar):
+    """the half of _get_current_user() that doesn't care where
+    the pieces came from, so the DOM and _scan_current_user()
+    can't disagree on how they are put together.
+    """
     student_json = {}
     # extract info from CDATA, if possible
-    for script in reversed(dom.select('script')):
-        match = RE_JS_CDATA.search(script.text)
+    for script in scripts:
+        match = RE_JS_CDATA.search(script)
         if not match:
             continue
         lou_data = match.group(1).strip()
@@ -475,7 +1272,6 @@ def _get_current_user(dom):
         break
 
     # extract from zendesk widget, if possible
-    zendesk = dom.select_one('div#zendesk-widget')
     zendesk_json = {}
     if zendesk is not None:
         try:
@@ -500,43 +1296,165 @@ def _get_current_user(dom):
     # extract from <body> and <title> - though it's probably just
     # cross-validation up to this point
     meta_json = {}
-    body = dom.body
-    assert body is not None
     user_id = body.get('data-user-id') or body.get('data-airbrake-user-id')
     if user_id is not None:
         meta_json['user_id'] = user_id
 
     # might find the name in title as well
-    title = dom.head.title
     if title is not None:
-        name = title.text.removeprefix('ManageBac |').strip()
+        name = title.removeprefix('ManageBac |').strip()
         meta_json.update(parse_user_name(name))
 
-    navbar = dom.select_one('div.navbar.navbar-collapse')
-    if navbar is not None:
-        profile = navbar.select_one('div.profile-link')
-        avatar_div = profile.select_one('div.avatar')
-        meta_json['user_avatar'] = parse_user_avatar(avatar_div)
+    if avatar is not None:
+        meta_json['user_avatar'] = avatar
 
     _update_dict(student_json, meta_json)
     return student_json
 
 
+# a start tag, minding quoted attribute values that contain '>'
+RE_START_TAG = re.compile(
+    r'''<([a-zA-Z][^\s/>]*)((?:[^>"']|"[^"]*"|'[^']*')*)>''')
+RE_END_DIV = re.compile(r'</div\s*>', flags=re.IGNORECASE)
+# same as what html.parser does with attributes
+RE_ATTR = re.compile(
+    r'''([^\s/>=][^\s/>=]*)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]*))?''')
+# what isn't markup: comments, and the text of scripts and styles.
+# one pattern, so that whichever starts first wins, like in a parser
+RE_OPAQUE = re.compile(
+    r'<!--.*?(?:-->|\Z)|(<(script|style)\b[^>]*>)(.*?)(</\2\s*>|\Z)',
+    flags=re.DOTALL | re.IGNORECASE)
+RE_TITLE = re.compile(r'<title\b[^>]*>(.*?)</title\s*>',
+                      flags=re.DOTALL | re.IGNORECASE)
+
+
+def _mask_opaque(html_text):
+    """html_text with comments and the text of <script> and <style>
+    blanked out, so no tag is found in there, and the text of every
+    <script>.  Blanks keep their length, so positions still match.
+    """
+    scripts = []
+
+    def blank(match):
+        start, name, inside, end = match.groups()
+        if start is None:
+            return ' ' * len(match.group(0))
+        if name.lower() == 'script':
+            scripts.append(inside)
+        return start + ' ' * len(inside) + end
+
+    return RE_OPAQUE.sub(blank, html_text), scripts
+
+
+def _scan_attrs(text):
+    attrs = {}
+    for match in RE_ATTR.finditer(text):
+        name, value = match.groups()
+        if value is None:
+            value = ''
+        elif value[:1] in {'"', "'"}:
+            value = value[1:-1]
+        # later duplicates win, like they do in bs4
+        attrs[name.lower()] = html.unescape(value)
+    if 'class' in attrs:
+        attrs['class'] = attrs['class'].split()
+    return attrs
+
+
+def _scan_tags(html_text, pos=0, endpos=None):
+    """yield (match, attrs) for every start tag in html_text."""
+    if endpos is None:
+        endpos = len(html_text)
+    for match in RE_START_TAG.finditer(html_text, pos, endpos):
+        yield match, _scan_attrs(match.group(2))
+
+
+def _scan_current_user(html_text):
+    """_get_current_user() without building a DOM: the same pieces
+    are fished out of the raw text with regular expressions.
+
+    Return None if anything can't be found (or can't be found with
+    confidence), in which case the caller should use the DOM.
+    """
+    html_text, scripts = _mask_opaque(html_text)
+    scripts.reverse()
+
+    body = zendesk = navbar = None
+    for match, attrs in _scan_tags(html_text):
+        name = match.group(1).lower()
+        if name == 'body' and body is None:
+            body = attrs
+        elif name == 'div':
+            if zendesk is None and attrs.get('id') == 'zendesk-widget':
+                zendesk = attrs
+            elif navbar is None and {'navbar', 'navbar-collapse'} \
+                    <= set(attrs.get('class', ())):
+                navbar = match
+        if body is not None and zendesk is not None and navbar is not None:
+            break
+    if body is None or zendesk is None:
+        return None
+    if not any(RE_JS_CDATA.search(script) for script in scripts):
+        return None
+
+    title = RE_TITLE.search(html_text)
+    if title is not None:
+        title = html.unescape(title.group(1))
+
+    avatar = None
+    if navbar is not None:
+        avatar = _scan_navbar_avatar(html_text, navbar.end())
+        if avatar is None:
+            return None
+
+    return _merge_current_user(scripts, zendesk, body, title, avatar)
+
+
+def _scan_navbar_avatar(html_text, pos):
+    """find div.profile-link div.avatar after pos, making sure
+    the avatar really is nested inside the profile link.
+    """
+    profile = None
+    for match, attrs in _scan_tags(html_text, pos):
+        if match.group(1).lower() != 'div':
+            continue
+        classes = attrs.get('class', ())
+        if profile is None:
+            if 'profile-link' in classes:
+                profile = match
+        elif 'avatar' in classes:
+            # every <div> opened in between must be closed in between
+            # and the profile link itself must still be open
+            between = html_text[profile.end():match.start()]
+            opened = len(re.findall(r'<div\b', between, flags=re.IGNORECASE))
+            closed = len(RE_END_DIV.findall(between))
+            if closed > opened:
+                return None
+            return _parse_avatar_attrs(attrs)
+    return None
+
+
+_CLASS_BASIC = Schema(
+    header=Field('div.content-block-header', get=text(strip=True)),
+    divs=Field('> div', many=True),
+)
+
+
 def _get_class_basic_info(content):
     """parse class name & ID from div.content-block.
     this seems to only show up in /students/classes/<CLASS_ID>.
     how generally this function can be used for is yet unknown.
     """
     class_json = {}
-    header = content.select_one('div.content-block-header')
-    class_json['class_name'] = header.text.strip()
+    parts = _CLASS_BASIC.extract(content)
+    class_json['class_name'] = parts['header']
 
     # the last div inside .content-block seems to be
     # often marked by the id "ib_class_<DIGITS>"
     #
     # does this always happen? i don't know. but then
     # again it's hard to say i know a better way.
-    last = content.find_all('div', recursive=False)[-1]
+    last = parts['divs'][-1]
     try:
         class_id = _parse_id('ib_class_', last['id'])
     except (KeyError, ValueError):
@@ -558,13 +1476,27 @@ def _get_class_basic_info(content):
 # div.info (together with the spurious .stretch class) is
 # exclusive to teachers, so we will just process them here.
 
+_TEACHER = Schema(
+    holder=Field('div.js-section-owner'),
+    info=Field('div.info'),
+)
+
+# asked of the first div.info only, and of its first name and list,
+# as select_one() used to
+_TEACHER_INFO = Schema(
+    name=Field('div.user-name'),
+    extra=Field('ul.extra', get=Schema(items=Field('li', many=True))),
+)
+
+
 def parse_teacher_element(member):
-    holder = member.select_one('div.js-section-owner')
-    holder_json = _parse_user_container(holder)
+    parts = _TEACHER.extract(member)
+    holder_json = _parse_user_container(parts['holder'])
 
-    info = member.select_one('div.info')
-    name = info.select_one('div.user-name')
-    extra = info.select_one('ul.extra')
+    # (no div.info fails, as it always has)
+    info = _TEACHER_INFO.extract(parts['info'])
+    name = info['name']
+    extra = info['extra']
 
     info_json = {}
     if name is not None:
@@ -572,15 +1504,14 @@ def parse_teacher_element(member):
             info_json['user_url'] = name.a['href']
         info_json['user_name'] = name.text
 
-    if extra is not None:
-        for item in extra.find_all('li'):
-            resource = item.a['href']
-            if resource.startswith('tel:'):
-                info_json['user_tel'] = item.a.text
-            elif resource.startswith('mailto:'):
-                info_json['user_email'] = item.a.text
-            else:
-                raise ValueError(f'unknown resource URI: {resource!r}')
+    for item in extra['items'] if extra is not None else ():
+        resource = item.a['href']
+        if resource.startswith('tel:'):
+            info_json['user_tel'] = item.a.text
+        elif resource.startswith('mailto:'):
+            info_json['user_email'] = item.a.text
+        else:
+            raise ValueError(f'unknown resource URI: {resource!r}')
 
     _update_dict(holder_json, info_json)
     return holder_json
@@ -607,7 +1538,7 @@ def _parse_user_container(div):
     except KeyError:
         pass
 
-    avatar_div = div.select_one('div.avatar')
+    avatar_div = _AVATAR.extract(div)['avatar']
     if avatar_div is not None:
         holder_json['user_avatar'] = parse_user_avatar(avatar_div)
 
@@ -637,16 +1568,19 @@ RE_THM_URL = re.compile('background-image: url\(([^\)]*)\);?')
 def parse_user_avatar(div):
     assert div.name == 'div', div
     assert 'avatar' in div['class'], div
+    return _parse_avatar_attrs(div.attrs)
+
 
+def _parse_avatar_attrs(attrs):
     avatar_json = {}
-    if 'empty' in div['class']:
+    if 'empty' in attrs['class']:
         avatar_json['avatar_url'] = None
     else:
-        url_match = RE_THM_URL.search(div['style'])
+        url_match = RE_THM_URL.search(attrs['style'])
         assert url_match is not None
         avatar_json['avatar_url'] = url_match.group(1)
 
-    avatar_json['user_initials'] = div['data-initials']
-    avatar_json['user_id'] = div['data-id']
+    avatar_json['user_initials'] = attrs['data-initials']
+    avatar_json['user_id'] = attrs['data-id']
 
     return avatar_json
@@ -0,0 +1,320 @@
+"""record every page we fetch, parse them again later.
+
+    recorder = ArchiveRecorder('pages.mba')
+    api = StudentAPI(domain, recorder=recorder)
+    ...                                  # crawl as usual
+
+    with ArchiveReader('pages.mba') as archive:
+        for entry, result in archive.replay():
+            ...                          # no network involved
+
+the archive is one append-only file of records, each a small fixed
+header, the request/response metadata as JSON and the raw body:
+
+    MAGIC
+    b'REC1' | meta length (u32) | body length (u64) | meta | body
+    b'REC1' | ...
+
+next to it, ARCHIVE.idx holds (record offset, body offset, body
+length) as three u64 per record, so the reader can jump straight to
+any entry.  a missing or torn index is rebuilt by scanning, and a
+torn last record (the recorder died mid-write) is ignored.
+
+the reader maps the archive into memory and hands out bodies as
+memoryviews into the mapping; the only copy made is the decoding to
+str the parsers need anyway.
+
+cookies carry the session token, so the Cookie and Set-Cookie
+headers are left out unless you ask for them with redact=False.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import urllib.parse
+
+from . import metrics
+
+
+__all__ = ['ArchiveRecorder', 'ArchiveReader', 'Entry']
+
+MAGIC = b'MBAPI-ARCHIVE\x001\n'
+_RECORD = struct.Struct('<4sIQ')
+_RECORD_TAG = b'REC1'
+_INDEX = struct.Struct('<QQQ')
+
+_SECRET_HEADERS = frozenset({'cookie', 'set-cookie', 'authorization'})
+
+
+def _headers(headers, redact):
+    if headers is None:
+        return None
+    if hasattr(headers, 'items'):
+        headers = headers.items()
+    return [[key, value] for key, value in headers
+            if not (redact and key.lower() in _SECRET_HEADERS)]
+
+
+def _read_index(path, size):
+    """Index entries that fit in an archive of size bytes, and where
+    the last one ends.
+    """
+    try:
+        with open(path + '.idx', 'rb') as fp:
+            data = fp.read()
+    except FileNotFoundError:
+        data = b''
+    usable = len(data) - len(data) % _INDEX.size
+    entries = list(_INDEX.iter_unpack(data[:usable]))
+    # the index may be behind the archive, never ahead of it
+    covered = (entries[-1][1] + entries[-1][2]) if entries else len(MAGIC)
+    if covered > size:
+        return [], len(MAGIC)
+    return entries, covered
+
+
+def _scan(buf, offset, size):
+    """Yield index entries for the whole records in buf[offset:size]."""
+    while offset + _RECORD.size <= size:
+        tag, meta_len, body_len = _RECORD.unpack_from(buf, offset)
+        if tag != _RECORD_TAG:
+            break
+        body_offset = offset + _RECORD.size + meta_len
+        if body_offset + body_len > size:
+            break
+        yield offset, body_offset, body_len
+        offset = body_offset + body_len
+
+
+def _recover(path):
+    """Bring the index up to date with the archive and cut off a
+    torn last record, so that appending starts from a clean end.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return
+    if size == 0:
+        return
+    with open(path, 'rb') as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path!r} is not an archive')
+        entries, covered = _read_index(path, size)
+        try:
+            index_size = os.path.getsize(path + '.idx')
+        except FileNotFoundError:
+            index_size = None
+        if covered == size and index_size == len(entries) * _INDEX.size:
+            return
+        if covered < size:
+            fp.seek(0)
+            data = fp.read()
+            entries.extend(_scan(data, covered, size))
+    end = (entries[-1][1] + entries[-1][2]) if entries else len(MAGIC)
+    with open(path + '.idx', 'wb') as fp:
+        for entry in entries:
+            fp.write(_INDEX.pack(*entry))
+    if end < size:
+        os.truncate(path, end)
+
+
+class ArchiveRecorder:
+    """Append responses to the archive at path (created if need be).
+    Safe to share between threads and clients.
+    """
+
+    def __init__(self, path, redact=True):
+        self.path = path
+        self.redact = redact
+        self._lock = threading.Lock()
+        _recover(path)
+        self._fp = open(path, 'ab')
+        if self._fp.tell() == 0:
+            self._fp.write(MAGIC)
+            self._fp.flush()
+        self._index = open(path + '.idx', 'ab')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+        return None
+
+    def close(self):
+        with self._lock:
+            self._fp.close()
+            self._index.close()
+
+    def record(self, url, status, headers, body, method='GET',
+               request_headers=None, encoding=None, elapsed=None):
+        """Append one exchange.  headers may be a mapping or a list
+        of (name, value) pairs, which keeps repeated headers.
+        """
+        meta = dict(
+            method=method, url=url,
+            path=urllib.parse.urlsplit(url).path, status=status,
+            headers=_headers(headers, self.redact),
+            request_headers=_headers(request_headers, self.redact),
+            encoding=encoding, elapsed=elapsed, time=time.time())
+        meta = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+        body = bytes(body)
+        with self._lock:
+            offset = self._fp.tell()
+            self._fp.write(_RECORD.pack(_RECORD_TAG, len(meta), len(body)))
+            self._fp.write(meta)
+            self._fp.write(body)
+            self._fp.flush()
+            # the index entry only once the record is all there
+            self._index.write(_INDEX.pack(
+                offset, offset + _RECORD.size + len(meta), len(body)))
+            self._index.flush()
+
+    def record_response(self, r):
+        """record() a requests.Response."""
+        request = r.request
+        self.record(
+            r.url, r.status_code, r.headers, r.content,
+            method=request.method if request is not None else 'GET',
+            request_headers=request.headers if request is not None
+            else None,
+            encoding=r.encoding, elapsed=r.elapsed.total_seconds())
+
+
+class Entry:
+    """One recorded exchange.  body is a memoryview into the
+    archive: it is only valid while the reader is open.
+    """
+
+    __slots__ = ('offset', 'body', '_meta_view', '_meta')
+
+    def __init__(self, offset, meta_view, body):
+        self.offset = offset
+        self.body = body
+        self._meta_view = meta_view
+        self._meta = None
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            self._meta = json.loads(str(self._meta_view, 'utf-8'))
+            self._meta_view = None
+        return self._meta
+
+    @property
+    def url(self):
+        return self.meta['url']
+
+    @property
+    def path(self):
+        return self.meta['path']
+
+    @property
+    def status(self):
+        return self.meta['status']
+
+    @property
+    def time(self):
+        return self.meta['time']
+
+    @property
+    def text(self):
+        """The body decoded straight out of the mapping."""
+        return str(self.body, self.meta.get('encoding') or 'utf-8',
+                   'replace')
+
+    def __repr__(self):
+        return f'<Entry {self.status} {self.path} at {self.offset}>'
+
+
+def _parsers():
+    # imported here so that recording doesn't need bs4
+    from .api import (student_home_to_json, student_classes_to_json,
+                      student_class_page_to_json)
+    return {
+        '/student/home': student_home_to_json,
+        '/student/classes/my': student_classes_to_json,
+        '/student/classes/:id': student_class_page_to_json,
+    }
+
+
+class ArchiveReader:
+    """Memory-mapped, read-only view of an archive."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(MAGIC):
+            raise ValueError(f'{path!r} is not an archive')
+        self._map = mmap.mmap(self._file.fileno(), 0,
+                              access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f'{path!r} is not an archive')
+        self._view = memoryview(self._map)
+        self._offsets = self._load_index(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+        return None
+
+    def close(self):
+        try:
+            if getattr(self, '_view', None) is not None:
+                self._view.release()
+            self._map.close()
+        except BufferError:
+            # somebody still holds a body; the mapping goes when
+            # they let go of it
+            pass
+        self._view = None
+        self._file.close()
+
+    def _load_index(self, size):
+        entries, covered = _read_index(self.path, size)
+        if covered < size:
+            entries.extend(_scan(self._map, covered, size))
+        return entries
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        offset, body_offset, body_len = self._offsets[i]
+        meta_offset = offset + _RECORD.size
+        return Entry(offset, self._view[meta_offset:body_offset],
+                     self._view[body_offset:body_offset + body_len])
+
+    def __iter__(self):
+        for i in range(len(self._offsets)):
+            yield self[i]
+
+    def entries(self, route=None, status=200):
+        """Entries whose route (see mbapi.metrics.route) is route,
+        if given, and whose status is status, if not None.
+        """
+        for entry in self:
+            if status is not None and entry.status != status:
+                continue
+            if route is not None and metrics.route(entry.path) != route:
+                continue
+            yield entry
+
+    def replay(self, parsers=None, **kwargs):
+        """Run the parser for its route over every page recorded
+        with a 200, yielding (entry, result).  parsers maps routes
+        to *_to_json functions and defaults to the home page, the
+        class list and class pages; kwargs go to every parser.
+        """
+        if parsers is None:
+            parsers = _parsers()
+        for entry in self.entries():
+            func = parsers.get(metrics.route(entry.path))
+            if func is not None:
+                yield entry, func(entry.text, **kwargs)
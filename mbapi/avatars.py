@@ -0,0 +1,273 @@
+"""download everyone's avatar, once.
+
+    fetcher = AvatarFetcher(api, 'avatars')
+    paths = fetcher.fetch_from(api.get_class_page_json(1000))
+    paths['https://.../tiny_1234.png']      # 'avatars/objects/3f/3f9a...png'
+
+the same few hundred thumbnails show up in every class page and class
+list, so urls are fetched once no matter how often they are asked
+for, by as many threads as you like, with at most `concurrency`
+downloads going at a time.  the client's rate limiter, retry policy
+and recorder see all of them.  urls on the client's own host are
+fetched by the client itself, so a rotated session cookie is picked
+up, and like everything else for one account they go out one at a
+time.  urls anywhere else (a CDN, say) go through a session of our
+own that takes no cookies, so the token never leaves the school and
+nobody else can replace it; they are throttled by their own host.
+
+files are stored under their SHA-256, so two urls serving the same
+image share a file and a file never changes once written.  an index
+next to them (index.sqlite) remembers which url gave which file with
+its ETag and Last-Modified; a url checked less than max_age seconds
+ago is taken as is, an older one is revalidated with a conditional
+request and only downloaded again if it changed.
+"""
+import collections.abc
+import concurrent.futures
+import hashlib
+import http.cookiejar
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from .util import parse_mime_header
+
+__all__ = ['AvatarFetcher', 'avatar_urls']
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS avatars (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    suffix TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    checked REAL NOT NULL
+);
+'''
+
+_UPSERT = '''
+INSERT INTO avatars (url, digest, suffix, etag, last_modified, checked)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (url) DO UPDATE SET
+    digest = excluded.digest,
+    suffix = excluded.suffix,
+    etag = excluded.etag,
+    last_modified = excluded.last_modified,
+    checked = excluded.checked
+'''
+
+_SUFFIXES = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'image/svg+xml': '.svg',
+}
+
+
+def avatar_urls(result):
+    """Every avatar_url in a parse result (users, class lists, class
+    pages, records, or lists of them), without duplicates, in the
+    order they first appear.
+    """
+    urls = {}
+    stack = [result]
+    while stack:
+        item = stack.pop()
+        if hasattr(item, 'to_dict'):
+            item = item.to_dict()
+        if isinstance(item, dict):
+            url = item.get('avatar_url')
+            if isinstance(url, str) and url:
+                urls[url] = None
+            stack.extend(reversed(item.values()))
+        elif (isinstance(item, collections.abc.Sequence)
+                and not isinstance(item, (str, bytes, bytearray))):
+            stack.extend(reversed(list(item)))
+    return list(urls)
+
+
+class AvatarFetcher:
+    """Fetch avatars through api (a StudentAPI) into directory,
+    which is created if need be.  Safe to share between
+    threads; close() it, or use it as a context manager, when done.
+    """
+
+    def __init__(self, api, directory, concurrency=8, max_age=86400,
+                 timeout=30):
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        self.directory = directory
+        self.max_age = max_age
+        self.timeout = timeout
+        self._api = api
+        self._hostname = urllib.parse.urlsplit(api._url('/')).hostname
+        # for everywhere else: none of the client's cookies, and
+        # none of theirs either.  (api has loaded requests already.)
+        import requests.sessions
+        self._session = requests.sessions.Session()
+        self._session.cookies.set_policy(
+            http.cookiejar.DefaultCookiePolicy(allowed_domains=()))
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite'),
+                                   check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.executescript(_SCHEMA)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            concurrency, thread_name_prefix='avatars')
+        # url -> future of whoever is fetching it right now
+        self._inflight = {}
+        self.stats = dict(downloaded=0, revalidated=0, fresh=0, failed=0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+        return None
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._session.close()
+        with self._lock:
+            self._db.close()
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _row(self, url):
+        with self._lock:
+            return self._db.execute(
+                'SELECT digest, suffix, etag, last_modified, checked '
+                'FROM avatars WHERE url = ?', (url,)).fetchone()
+
+    def _object(self, digest, suffix):
+        return os.path.join(self.directory, 'objects', digest[:2],
+                            digest + suffix)
+
+    def path(self, url):
+        """Where the avatar at url is on disk, if it has been fetched;
+        no request is made.
+        """
+        row = self._row(url)
+        if row is None:
+            return None
+        path = self._object(row[0], row[1])
+        return path if os.path.exists(path) else None
+
+    def _store(self, content, content_type):
+        digest = hashlib.sha256(content).hexdigest()
+        suffix = _SUFFIXES.get(content_type, '')
+        path = self._object(digest, suffix)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # written aside and renamed, so nobody sees half a file
+            fd, temp = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, 'wb') as fp:
+                    fp.write(content)
+                os.replace(temp, path)
+            except BaseException:
+                os.unlink(temp)
+                raise
+        return digest, suffix
+
+    def _fetch(self, url):
+        row = self._row(url)
+        headers = {}
+        if row is not None:
+            digest, suffix, etag, last_modified, checked = row
+            path = self._object(digest, suffix)
+            if not os.path.exists(path):
+                row = None
+            elif time.time() - checked < self.max_age:
+                self._count('fresh')
+                return path
+            else:
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+
+        r = self._get(url, headers)
+        if r.status_code == 304 and row is not None:
+            with self._lock, self._db:
+                self._db.execute(
+                    'UPDATE avatars SET checked = ? WHERE url = ?',
+                    (time.time(), url))
+            self._count('revalidated')
+            return path
+        r.raise_for_status()
+        content_type, _ = parse_mime_header(
+            r.headers.get('Content-Type', ''))
+        digest, suffix = self._store(r.content, content_type)
+        with self._lock, self._db:
+            self._db.execute(_UPSERT, (
+                url, digest, suffix, r.headers.get('ETag'),
+                r.headers.get('Last-Modified'), time.time()))
+        self._count('downloaded')
+        return self._object(digest, suffix)
+
+    def _get(self, url, headers):
+        # not through the client's ResponseCache: revalidating is our
+        # job, and it would only keep a second copy of every image
+        kwargs = dict(headers=headers, timeout=self.timeout)
+        hostname = urllib.parse.urlsplit(self._api._url(url)).hostname
+        if hostname != self._hostname:
+            return self._api._get(url, False, None, self._session, **kwargs)
+        return self._api._get(url, False, None, **kwargs)
+
+    def _done(self, url, future):
+        with self._lock:
+            if self._inflight.get(url) is future:
+                del self._inflight[url]
+
+    def submit(self, url):
+        """A future for the path of the avatar at url.  Asking for a
+        url that is already being fetched joins that fetch.
+        """
+        with self._lock:
+            future = self._inflight.get(url)
+            if future is not None:
+                return future
+            future = self._inflight[url] = self._executor.submit(
+                self._fetch, url)
+        # outside the lock: a future that is already done calls back
+        # right away
+        future.add_done_callback(lambda f: self._done(url, f))
+        return future
+
+    def fetch(self, url):
+        """The path of the avatar at url, fetching it if need be."""
+        return self.submit(url).result()
+
+    def fetch_all(self, urls):
+        """{url: path} for every url, fetched concurrently.  A url
+        that can't be fetched is logged and maps to None.
+        """
+        futures = {url: self.submit(url) for url in dict.fromkeys(urls)
+                   if url}
+        paths = {}
+        for url, future in futures.items():
+            try:
+                paths[url] = future.result()
+            except Exception as e:
+                logger.warning(f'could not fetch avatar {url}: {e!r}')
+                self._count('failed')
+                paths[url] = None
+        return paths
+
+    def fetch_from(self, *results):
+        """fetch_all() the avatars found in parse results (see
+        avatar_urls).
+        """
+        return self.fetch_all(avatar_urls(list(results)))
@@ -0,0 +1,157 @@
+"""parse a lot of pages on all cores.
+
+    from mbapi.batch import parse_pages
+
+    for result in parse_pages(pages, 'class_page', workers=8):
+        ...
+
+parsing is CPU work under the GIL, so threads don't help; this hands
+pages out to a process pool in chunks instead.  only the page text
+goes to the workers and only the finished result comes back (lazy
+sections included, as plain lists), never a DOM.
+
+pages are read from the iterable as the workers get through them,
+so a generator over months of archived pages (see mbapi.archive) is
+fine: no more than a few chunks per worker are in flight at a time.
+"""
+import collections
+import concurrent.futures
+import os
+
+from . import api
+
+
+__all__ = ['parse_pages', 'KINDS']
+
+KINDS = {
+    'home': api.student_home_to_json,
+    'classes': api.student_classes_to_json,
+    'class_page': api.student_class_page_to_json,
+}
+
+# chunks in flight per worker: enough to keep them busy between
+# our trips back to the iterable
+_PREFETCH = 2
+
+
+class _Failed:
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _parse_chunk(func, pages, kwargs, return_exceptions, encoding):
+    results = []
+    for page in pages:
+        try:
+            if not isinstance(page, str):
+                # the parsers (and their fast paths) want text
+                page = bytes(page).decode(encoding)
+            results.append(func(page, **kwargs))
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(_Failed(e))
+    return results
+
+
+def _chunks(pages, size):
+    chunk = []
+    for page in pages:
+        if isinstance(page, memoryview):
+            # can't be pickled
+            page = bytes(page)
+        chunk.append(page)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_pages(pages, kind, workers=None, chunksize=8, ordered=True,
+                return_exceptions=False, executor=None, encoding='utf-8',
+                **kwargs):
+    """Parse every page (str, bytes or memoryview) with kind, which
+    is 'home', 'classes', 'class_page' or a *_to_json function, and
+    yield the results.  Pages that aren't str are decoded with
+    encoding first.  kwargs (features, partial, ...) go to the parser.
+
+    If ordered, results come in the order of pages; otherwise they
+    come as soon as they are ready, as (index, result) pairs.  If
+    return_exceptions, a page that fails to parse yields its
+    exception in place of a result instead of ending the batch.
+
+    workers defaults to one per core; 0 parses right here, which is
+    handy for debugging.  Pass executor to use a pool of your own.
+    """
+    func = KINDS.get(kind, kind) if isinstance(kind, str) else kind
+    if not callable(func):
+        raise ValueError(f'unknown kind {kind!r}, expected one of '
+                         f'{sorted(KINDS)} or a function')
+    if chunksize < 1:
+        raise ValueError('chunksize must be at least 1')
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 0:
+        raise ValueError('workers must not be negative')
+
+    if executor is None and workers == 0:
+        return _parse_here(func, pages, ordered, return_exceptions,
+                           encoding, kwargs)
+    return _parse_pool(func, pages, workers, chunksize, ordered,
+                       return_exceptions, executor, encoding, kwargs)
+
+
+def _unwrap(result):
+    return result.error if isinstance(result, _Failed) else result
+
+
+def _parse_here(func, pages, ordered, return_exceptions, encoding,
+                kwargs):
+    for i, page in enumerate(pages):
+        result = _unwrap(_parse_chunk(func, [page], kwargs,
+                                      return_exceptions, encoding)[0])
+        yield result if ordered else (i, result)
+
+
+def _parse_pool(func, pages, workers, chunksize, ordered,
+                return_exceptions, executor, encoding, kwargs):
+    own = executor is None
+    if own:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    limit = max(1, workers) * _PREFETCH
+    chunks = enumerate(_chunks(pages, chunksize))
+    # future -> index of its first page
+    pending = collections.OrderedDict()
+
+    def submit():
+        for start, chunk in chunks:
+            future = executor.submit(_parse_chunk, func, chunk, kwargs,
+                                     return_exceptions, encoding)
+            pending[future] = start * chunksize
+            return True
+        return False
+
+    try:
+        while len(pending) < limit and submit():
+            pass
+        while pending:
+            if ordered:
+                future = next(iter(pending))
+                done = (future,)
+            else:
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                start = pending.pop(future)
+                for i, result in enumerate(future.result(), start):
+                    result = _unwrap(result)
+                    yield result if ordered else (i, result)
+                submit()
+    finally:
+        for future in pending:
+            future.cancel()
+        if own:
+            executor.shutdown(wait=True, cancel_futures=True)
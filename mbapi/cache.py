@@ -0,0 +1,297 @@
+"""conditional-GET cache for StudentAPI.get().
+
+an entry remembers the ETag/Last-Modified of a page so the next
+request can ask the server whether it changed at all; a 304 Not
+Modified then gets answered with the body we already have.  pages
+without either validator are simply trusted for `ttl` seconds.
+"""
+import collections
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+__all__ = ['cache_key', 'CachedResponse', 'ResponseCache',
+           'FileResponseCache', 'PopoverCache']
+
+
+# hop-by-hop headers and cookies must never be replayed from cache
+_UNCACHED_HEADERS = frozenset({
+    'set-cookie', 'connection', 'keep-alive', 'transfer-encoding',
+    'content-encoding', 'content-length',
+})
+
+
+def cache_key(identity, url):
+    """Hash identity and URL together so that two accounts never
+    share an entry, and so the key is safe to use as a file name.
+    """
+    h = hashlib.sha256()
+    h.update(str(identity).encode('utf-8'))
+    h.update(b'\0')
+    h.update(url.encode('utf-8'))
+    return h.hexdigest()
+
+
+class CachedResponse:
+    """What is left of a response once it has been cached."""
+
+    __slots__ = ('url', 'status', 'headers', 'content', 'encoding',
+                 'stored_at')
+
+    def __init__(self, url, status, headers, content, encoding,
+                 stored_at=None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.stored_at = time.time() if stored_at is None else stored_at
+
+    @classmethod
+    def from_response(cls, r):
+        headers = {key: value for key, value in r.headers.items()
+                   if key.lower() not in _UNCACHED_HEADERS}
+        return cls(r.url, r.status_code, headers, r.content, r.encoding)
+
+    @property
+    def etag(self):
+        return self.headers.get('ETag')
+
+    @property
+    def last_modified(self):
+        return self.headers.get('Last-Modified')
+
+    def validators(self):
+        """Request headers that make the next GET conditional."""
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def is_fresh(self, ttl, now=None):
+        """An entry without validators can't be revalidated,
+        so it is served as-is until it is ttl seconds old.
+        """
+        if self.etag is not None or self.last_modified is not None:
+            return False
+        return (now or time.time()) - self.stored_at < ttl
+
+    def revalidated(self, r):
+        """Fold the headers of a 304 into this entry, as RFC 9111
+        says we should, and restart the clock.
+        """
+        for key, value in r.headers.items():
+            if key.lower() not in _UNCACHED_HEADERS:
+                self.headers[key] = value
+        self.stored_at = time.time()
+
+    def to_response(self):
+        import requests.models
+        import requests.structures
+
+        r = requests.models.Response()
+        r.url = self.url
+        r.status_code = self.status
+        r.reason = 'OK'
+        r.headers = requests.structures.CaseInsensitiveDict(self.headers)
+        r.encoding = self.encoding
+        r._content = self.content
+        return r
+
+
+class ResponseCache:
+    """In-memory cache holding up to maxsize entries (None
+    for no limit), dropping the least recently used first.
+    """
+
+    def __init__(self, ttl=60, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileResponseCache(ResponseCache):
+    """Same as ResponseCache, except every entry is also written to
+    `directory` (two files per entry: KEY.json and KEY.body) so that
+    it survives the process.  maxsize bounds the entries on disk as
+    well, again dropping the least recently used first.
+    """
+
+    def __init__(self, directory, ttl=60, maxsize=256):
+        super().__init__(ttl, maxsize)
+        self.directory = os.fspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        # keys with files on disk, least recently used first; what
+        # an earlier process left behind counts from its mtime
+        self._disk = collections.OrderedDict()
+        self._disk_lock = threading.Lock()
+        keys = []
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext == '.json':
+                mtime = os.path.getmtime(self._path(key, 'json'))
+                keys.append((mtime, key))
+            elif ext == '.body' and not os.path.exists(
+                    self._path(key, 'json')):
+                # the crash between writing the body and its json
+                os.unlink(self._path(key, 'body'))
+        with self._disk_lock:
+            for _, key in sorted(keys):
+                self._disk[key] = None
+            self._trim()
+
+    def _touch(self, key):
+        with self._disk_lock:
+            self._disk[key] = None
+            self._disk.move_to_end(key)
+            self._trim()
+
+    def _trim(self):
+        if self.maxsize is None:
+            return
+        while len(self._disk) > self.maxsize:
+            key, _ = self._disk.popitem(last=False)
+            with self._lock:
+                self._entries.pop(key, None)
+            for ext in ('json', 'body'):
+                try:
+                    os.unlink(self._path(key, ext))
+                except FileNotFoundError:
+                    pass
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, f'{key}.{ext}')
+
+    def get(self, key):
+        entry = super().get(key)
+        if entry is not None:
+            self._touch(key)
+            return entry
+        try:
+            with open(self._path(key, 'json'), encoding='utf-8') as fp:
+                meta = json.load(fp)
+            with open(self._path(key, 'body'), 'rb') as fp:
+                content = fp.read()
+        except (OSError, ValueError):
+            return None
+        entry = CachedResponse(content=content, **meta)
+        super().put(key, entry)
+        self._touch(key)
+        return entry
+
+    def put(self, key, entry):
+        super().put(key, entry)
+        meta = dict(url=entry.url, status=entry.status,
+                    headers=entry.headers, encoding=entry.encoding,
+                    stored_at=entry.stored_at)
+        # body first: a crash in between then leaves old validators
+        # next to the new body, which costs one full download later,
+        # rather than new validators vouching for an old body.
+        self._replace(self._path(key, 'body'), entry.content)
+        self._replace(self._path(key, 'json'),
+                      json.dumps(meta).encode('utf-8'))
+        self._touch(key)
+
+    def _replace(self, path, data):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def clear(self):
+        super().clear()
+        with self._disk_lock:
+            self._disk.clear()
+        for name in os.listdir(self.directory):
+            if name.endswith(('.json', '.body')):
+                os.unlink(os.path.join(self.directory, name))
+
+
+class PopoverCache:
+    """Parsed class popovers (see mbapi.api.class_popover_to_json)
+    by absolute popover URL, for
+    get_my_classes_json(load_external=True).
+
+    Subject, teachers and head count hardly ever change, so an entry
+    is used without asking the server for ttl seconds.  At most
+    maxsize entries are kept (None for no limit), dropping the least
+    recently used first.  Popovers are the same for everyone in the
+    class, so one cache can serve every account.
+    """
+
+    def __init__(self, ttl=3600, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # url -> (stored_at, popover_json)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url, now=None):
+        """A copy of the popover at url, or None if it isn't
+        cached or is older than ttl.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and now - entry[0] >= self.ttl:
+                del self._entries[url]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, url, popover_json, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[url] = (now, copy.deepcopy(popover_json))
+            self._entries.move_to_end(url)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,210 @@
+"""what changed since the last poll?
+
+    snapshots = SnapshotStore('snapshots.db')
+    for event in snapshots.sync_classes('alice', api.get_my_classes_json()):
+        index(event)
+
+the first sync of a key reports everything as added; later ones
+report only what was added, removed or changed, as events like
+
+    {'op': 'change', 'kind': 'class', 'class_id': '1000',
+     'record': {...the new class...},
+     'patch': [{'op': 'replace', 'path': '/class_name',
+                'value': 'Class 1000b'}]}
+
+classes are told apart by class_id and members by user_id.  'add'
+events carry the record, 'remove' events the old record, and
+'change' events the new record plus a JSON Patch (RFC 6902) that
+turns the old one into it.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from .util import json_default
+
+
+__all__ = ['patch', 'diff_records', 'diff_classes', 'diff_class_page',
+           'SnapshotStore']
+
+
+def _canonical(doc):
+    return json.dumps(doc, sort_keys=True, separators=(',', ':'),
+                      ensure_ascii=False, default=json_default)
+
+
+def _pointer(path, key):
+    return f"{path}/{str(key).replace('~', '~0').replace('/', '~1')}"
+
+
+def patch(old, new, path=''):
+    """A JSON Patch from old to new.  Dicts are compared key by key;
+    anything else, lists included, is replaced whole.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key, value in old.items():
+            if key not in new:
+                ops.append(dict(op='remove', path=_pointer(path, key)))
+            else:
+                ops.extend(patch(value, new[key], _pointer(path, key)))
+        for key, value in new.items():
+            if key not in old:
+                ops.append(dict(op='add', path=_pointer(path, key),
+                                value=value))
+        return ops
+    if old == new:
+        return []
+    return [dict(op='replace', path=path, value=new)]
+
+
+def diff_records(old, new, key, kind, **context):
+    """Yield events turning the list of records old into new, telling
+    records apart by their `key` field.  Records without one are
+    ignored.  context is copied into every event.
+    """
+    before = {record[key]: record for record in old or ()
+              if record.get(key) is not None}
+    after = {record[key]: record for record in new or ()
+             if record.get(key) is not None}
+    for ident, record in after.items():
+        if ident not in before:
+            yield dict(op='add', kind=kind, **context,
+                       **{key: ident}, record=record)
+            continue
+        ops = patch(before[ident], record)
+        if ops:
+            yield dict(op='change', kind=kind, **context,
+                       **{key: ident}, record=record, patch=ops)
+    for ident, record in before.items():
+        if ident not in after:
+            yield dict(op='remove', kind=kind, **context,
+                       **{key: ident}, record=record)
+
+
+def _diff_one(old, new, kind, **context):
+    if old is None and new is None:
+        return
+    if old is None:
+        yield dict(op='add', kind=kind, **context, record=new)
+    elif new is None:
+        yield dict(op='remove', kind=kind, **context, record=old)
+    else:
+        ops = patch(old, new)
+        if ops:
+            yield dict(op='change', kind=kind, **context, record=new,
+                       patch=ops)
+
+
+def diff_classes(old, new):
+    """Events between two results of get_my_classes_json()."""
+    yield from _diff_one(old.get('whoami'), new.get('whoami'), 'whoami')
+    yield from diff_records(old.get('classes'), new.get('classes'),
+                            'class_id', 'class')
+
+
+def diff_class_page(old, new):
+    """Events between two results of get_class_page_json() for the
+    same class.  Members come as kind 'teacher' and 'student'.
+    """
+    yield from _diff_one(old.get('whoami'), new.get('whoami'), 'whoami')
+    class_id = (new.get('class') or old.get('class') or {}).get('class_id')
+    yield from _diff_one(old.get('class'), new.get('class'), 'class',
+                         class_id=class_id)
+    for field, kind in (('teachers', 'teacher'), ('students', 'student')):
+        yield from diff_records(old.get(field), new.get(field),
+                                'user_id', kind, class_id=class_id)
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshots (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+'''
+
+_UPSERT = '''
+INSERT INTO snapshots (key, digest, data, updated) VALUES (?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    digest = excluded.digest,
+    data = excluded.data,
+    updated = excluded.updated
+'''
+
+
+class SnapshotStore:
+    """The last result seen for every key, in the SQLite database
+    at path (in memory by default).  Keys are whatever you like,
+    as long as one key always holds the same kind of result.
+
+    A digest of each snapshot is kept alongside, so a poll where
+    nothing changed costs a hash and no diffing.
+    """
+
+    def __init__(self, path=':memory:'):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+        return None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def get(self, key):
+        """The last snapshot stored under key, or None."""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT data FROM snapshots WHERE key = ?', (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def forget(self, key):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM snapshots WHERE key = ?', (key,))
+
+    def sync(self, key, doc, differ):
+        """Store doc under key and return the events differ(old, doc)
+        yields, with old being {} on the first sync.
+        """
+        data = _canonical(doc)
+        digest = hashlib.blake2b(data.encode('utf-8'),
+                                 digest_size=16).hexdigest()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT digest, data FROM snapshots WHERE key = ?',
+                (key,)).fetchone()
+        if row is not None and row[0] == digest:
+            return []
+        old = {} if row is None else json.loads(row[1])
+        # diff the plain form, in case doc has records or lazy
+        # sections in it
+        events = list(differ(old, json.loads(data)))
+        with self._lock, self._db:
+            self._db.execute(_UPSERT, (key, digest, data, time.time()))
+        return events
+
+    def sync_classes(self, key, doc):
+        """sync() a result of get_my_classes_json()."""
+        return self.sync(f'{key}:classes', doc, diff_classes)
+
+    def sync_class_page(self, key, doc):
+        """sync() a result of get_class_page_json(); the class ID is
+        taken from doc.  A page without one raises ValueError: sync()
+        it under a key of your own instead.
+        """
+        class_id = (doc.get('class') or {}).get('class_id')
+        if class_id is None:
+            raise ValueError('class page has no class_id to key its '
+                             'snapshot by')
+        return self.sync(f'{key}:class/{class_id}', doc, diff_class_page)
@@ -0,0 +1,114 @@
+"""memoize the *_to_json parsers by the content of the page.
+
+polling the same page over and over mostly returns the very same
+bytes, and there is no point in running BeautifulSoup over them
+again when we already know what comes out.
+"""
+import collections
+import copy
+import hashlib
+import shelve
+import threading
+
+
+__all__ = ['ParseCache']
+
+
+class ParseCache:
+    """LRU of extracted dicts keyed by parser and a hash of the HTML.
+
+    At most maxsize results are held in memory.  If path is given,
+    results are also written through to a shelve there, which is
+    consulted on a memory miss, so a restarted worker starts warm.
+    Callers always get their own deep copy and are free to mutate it;
+    lazy sections come back unparsed, except through the shelve,
+    which pickles (and so parses) them.
+    """
+
+    def __init__(self, maxsize=128, path=None):
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._shelf = shelve.open(path) if path is not None else None
+
+    @staticmethod
+    def key(func, html_text):
+        digest = hashlib.blake2b(html_text.encode('utf-8'), digest_size=16)
+        return f'{func.__module__}.{func.__qualname__}:{digest.hexdigest()}'
+
+    def parse(self, func, html_text, **kwargs):
+        """Return func(html_text, **kwargs), calling func only if
+        this exact page has not been seen before.  kwargs are not
+        part of the key, so they must not change the result
+        (the choice of parser, for one, doesn't).  lazy_sections is
+        the exception: views and lists are kept apart.
+        """
+        key = self.key(func, html_text)
+        if kwargs.get('lazy_sections'):
+            key += ':lazy'
+        with self._lock:
+            result = self._lookup(key)
+            if result is not None:
+                self.hits += 1
+                return copy.deepcopy(result)
+            self.misses += 1
+
+        # parse outside the lock; two threads racing on the same
+        # page both do the work, which is harmless
+        result = func(html_text, **kwargs)
+        with self._lock:
+            self._store(key, copy.deepcopy(result))
+        return result
+
+    def _lookup(self, key):
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+        elif self._shelf is not None:
+            result = self._shelf.get(key)
+            if result is not None:
+                self._remember(key, result)
+        return result
+
+    def _store(self, key, result):
+        self._remember(key, result)
+        if self._shelf is not None:
+            self._shelf[key] = result
+
+    def _remember(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def info(self):
+        """hits, misses and current size, like functools.lru_cache."""
+        with self._lock:
+            return dict(hits=self.hits, misses=self.misses,
+                        maxsize=self.maxsize, currsize=len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            if self._shelf is not None:
+                self._shelf.clear()
+
+    def close(self):
+        if self._shelf is not None:
+            self._shelf.close()
+            self._shelf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+        return None
+
+    def __len__(self):
+        return len(self._entries)
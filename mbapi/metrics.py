@@ -0,0 +1,267 @@
+"""where does the time go?
+
+every request and every parse is reported as an event, a plain dict,
+to each callback registered with add_hook().  nothing is measured
+unless somebody is listening.
+
+request events look like
+
+    {'event': 'request', 'path': '/student/classes/1000',
+     'route': '/student/classes/:id', 'status': 200, 'bytes': 51234,
+     'dns': None, 'connect': None, 'ttfb': 0.081, 'download': 0.004,
+     'total': 0.085, 'wait': 0.5, 'retry': 0.0, 'cookie_refreshed': True,
+     'from_cache': False}
+
+(times in seconds; dns and connect are only known to the asyncio
+client, and only when a connection was actually set up.  the phases
+and total are those of the last attempt; what came before it is in
+wait, for the rate limiter, the circuit breaker and other requests
+of the same client, and retry, for failed attempts and the backoff
+after them) and parse
+events like
+
+    {'event': 'parse', 'function': 'student_class_page_to_json',
+     'bytes': 51234, 'build': 0.012, 'extract': 0.003}
+
+Aggregator is a ready-made hook that keeps histograms of all that
+and dumps them in Prometheus text format or as JSON.
+"""
+import bisect
+import heapq
+import json
+import logging
+import re
+import threading
+
+__all__ = ['add_hook', 'remove_hook', 'enabled', 'emit', 'route',
+           'Aggregator']
+
+logger = logging.getLogger(__name__)
+
+_hooks = []
+
+
+def add_hook(callback):
+    """Call callback(event) for every event from now on."""
+    _hooks.append(callback)
+    return callback
+
+
+def remove_hook(callback):
+    _hooks.remove(callback)
+
+
+def enabled():
+    """Is anyone listening?  Check before measuring anything."""
+    return bool(_hooks)
+
+
+def emit(event, **data):
+    data['event'] = event
+    for hook in tuple(_hooks):
+        try:
+            hook(data)
+        except Exception:
+            # a broken hook shouldn't take the scraper down with it
+            logger.exception(f'metrics hook {hook!r} failed')
+
+
+RE_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+def route(path):
+    """/student/classes/1000/popover -> /student/classes/:id/popover,
+    so that labels don't grow with the number of classes.
+    """
+    return RE_ID_SEGMENT.sub('/:id', path.split('?', 1)[0])
+
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # one more for +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            total += count
+            yield bound, total
+
+
+# name -> (type, help, buckets)
+_METRICS = {
+    'mbapi_request_seconds': (
+        'histogram', 'Time spent on a request, by phase.', SECONDS_BUCKETS),
+    'mbapi_response_bytes': (
+        'histogram', 'Size of response bodies.', BYTES_BUCKETS),
+    'mbapi_requests_total': (
+        'counter', 'Requests made, by route and status.', None),
+    'mbapi_cookie_refreshes_total': (
+        'counter', 'Responses that rotated the session token.', None),
+    'mbapi_parse_seconds': (
+        'histogram', 'Time spent parsing, by function and stage.',
+        SECONDS_BUCKETS),
+}
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    inner = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels)
+    return '{' + inner + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Aggregator:
+    """Hook that accumulates events into histograms and counters.
+
+        agg = metrics.add_hook(metrics.Aggregator())
+        ...
+        print(agg.to_prometheus())
+
+    It also remembers the `keep` slowest requests and parses, which
+    is usually the quickest way to the page that hurts.
+    """
+
+    def __init__(self, keep=10):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._series = {}
+        self._slowest = dict(request=[], parse=[])
+        self._seq = 0
+
+    def __call__(self, event):
+        kind = event.get('event')
+        with self._lock:
+            if kind == 'request':
+                self._request(event)
+            elif kind == 'parse':
+                self._parse(event)
+
+    def _observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        series = self._series.get(key)
+        if series is None:
+            _, _, buckets = _METRICS[name]
+            series = self._series[key] = (
+                Histogram(buckets) if buckets is not None else [0])
+        if isinstance(series, Histogram):
+            series.observe(value)
+        else:
+            series[0] += value
+
+    def _remember(self, kind, seconds, event):
+        # seq breaks ties so that dicts are never compared
+        self._seq += 1
+        heap = self._slowest[kind]
+        item = (seconds, self._seq, event)
+        if len(heap) < self.keep:
+            heapq.heappush(heap, item)
+        elif self.keep:
+            heapq.heappushpop(heap, item)
+
+    def _request(self, event):
+        where = dict(route=event.get('route', ''))
+        for phase in ('dns', 'connect', 'ttfb', 'download', 'total', 'wait',
+                      'retry'):
+            value = event.get(phase)
+            if value is not None:
+                self._observe('mbapi_request_seconds',
+                              dict(where, phase=phase), value)
+        if event.get('bytes') is not None:
+            self._observe('mbapi_response_bytes', where, event['bytes'])
+        self._observe('mbapi_requests_total',
+                      dict(where, status=event.get('status'),
+                           cache='hit' if event.get('from_cache')
+                                 else 'miss'), 1)
+        if event.get('cookie_refreshed'):
+            self._observe('mbapi_cookie_refreshes_total', {}, 1)
+        if event.get('total') is not None:
+            self._remember('request', event['total'], event)
+
+    def _parse(self, event):
+        function = event.get('function', '')
+        for stage in ('build', 'extract'):
+            value = event.get(stage)
+            if value is not None:
+                self._observe('mbapi_parse_seconds',
+                              dict(function=function, stage=stage), value)
+        self._remember('parse', (event.get('build') or 0)
+                       + (event.get('extract') or 0), event)
+
+    def slowest(self, kind='request'):
+        """The slowest events of a kind, slowest first."""
+        with self._lock:
+            return [event for _, _, event
+                    in sorted(self._slowest[kind], reverse=True)]
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            for heap in self._slowest.values():
+                heap.clear()
+
+    def to_prometheus(self):
+        """Everything, in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, (kind, help, _) in _METRICS.items():
+                series = [(labels, value) for (n, labels), value
+                          in sorted(self._series.items(),
+                                        key=lambda item: repr(item[0]))
+                          if n == name]
+                if not series:
+                    continue
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in series:
+                    if not isinstance(value, Histogram):
+                        lines.append(f'{name}{_labels(labels)} {value[0]}')
+                        continue
+                    for bound, count in value.cumulative():
+                        le = (*labels, ('le', _number(bound)))
+                        lines.append(f'{name}_bucket{_labels(le)} {count}')
+                    lines.append(f'{name}_sum{_labels(labels)} '
+                                 f'{_number(value.sum)}')
+                    lines.append(f'{name}_count{_labels(labels)} '
+                                 f'{value.count}')
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self, **kwargs):
+        """Everything as a JSON document; kwargs go to json.dumps()."""
+        metrics = {}
+        with self._lock:
+            for (name, labels), value in self._series.items():
+                entry = dict(labels=dict(labels))
+                if isinstance(value, Histogram):
+                    entry.update(
+                        buckets={_number(bound): count for bound, count
+                                 in value.cumulative()},
+                        sum=value.sum, count=value.count)
+                else:
+                    entry['value'] = value[0]
+                metrics.setdefault(name, []).append(entry)
+        slowest = {kind: self.slowest(kind) for kind in self._slowest}
+        return json.dumps(dict(metrics=metrics, slowest=slowest), **kwargs)
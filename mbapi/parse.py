@@ -1,6 +1,213 @@
 """parsers.
 
 this is where most of the heavy-lifting HTML scraping is done.
+
+every select_one() walks the subtree it is called on from the top,
+so an extractor asking ten questions of one element walks it ten
+times.  a Schema asks all of its questions in the same walk:
+
+    schema = Schema(
+        icon=Field('img.sebo-icon', get=attr('src')),
+        name=Field('h4.title a', get=text(strip=True)),
+        items=Field('div.class-dropdown-item', many=True),
+    )
+    schema.extract(div)  # -> {'icon': ..., 'name': ..., 'items': [...]}
+
+selectors are a small subset of CSS: compounds of a tag name, .class,
+#id and [attr], joined by descendant (space) or child (>) combinators.
+a leading > anchors the selector to the element being extracted from,
+like find_all(recursive=False) would.
 """
+import re
+
+
+__all__ = ['Field', 'Schema', 'attr', 'text']
+
+
+RE_COMPOUND = re.compile(r'([a-zA-Z][\w-]*|\*)?((?:[.#][\w-]+|\[[\w-]+\])*)')
+RE_SIMPLE = re.compile(r'([.#])([\w-]+)|\[([\w-]+)\]')
+
+# stands in for the element the schema is run on
+_SCOPE = object()
+
+
+class _Compound:
+    __slots__ = ('name', 'classes', 'id', 'attrs')
+
+    def __init__(self, name, classes, id, attrs):
+        self.name = name
+        self.classes = classes
+        self.id = id
+        self.attrs = attrs
+
+    def matches(self, tag):
+        if self.name is not None and tag.name != self.name:
+            return False
+        if self.classes and not self.classes.issubset(tag.get('class') or ()):
+            return False
+        if self.id is not None and tag.get('id') != self.id:
+            return False
+        for name in self.attrs:
+            if not tag.has_attr(name):
+                return False
+        return True
+
+
+def _compile(selector):
+    """turn a selector into a list of compounds and combinators,
+    e.g. 'div.a > span' -> [div.a, '>', span]
+    """
+    tokens = selector.replace('>', ' > ').split()
+    if not tokens:
+        raise ValueError('empty selector')
+    chain = []
+    if tokens[0] == '>':
+        chain.append(_SCOPE)
+    for token in tokens:
+        if token == '>':
+            if not chain or chain[-1] == '>':
+                raise ValueError(f'misplaced > in {selector!r}')
+            chain.append('>')
+            continue
+        if chain and chain[-1] != '>':
+            chain.append(' ')
+        match = RE_COMPOUND.fullmatch(token)
+        if match is None or not token:
+            raise ValueError(f'unsupported selector {token!r} '
+                             f'in {selector!r}')
+        name, rest = match.groups()
+        classes, id, attrs = set(), None, []
+        for simple in RE_SIMPLE.finditer(rest):
+            kind, value, attr_name = simple.groups()
+            if kind == '.':
+                classes.add(value)
+            elif kind == '#':
+                id = value
+            else:
+                attrs.append(attr_name)
+        chain.append(_Compound(None if name == '*' else name,
+                               frozenset(classes), id, tuple(attrs)))
+    if chain[-1] == '>':
+        raise ValueError(f'dangling > in {selector!r}')
+    return chain
+
+
+def _matches(chain, i, tag, scope):
+    """does chain[:i+1] match with chain[i] landing on tag?"""
+    compound = chain[i]
+    if compound is _SCOPE:
+        return tag is scope
+    if not compound.matches(tag):
+        return False
+    if i == 0:
+        return True
+    combinator = chain[i - 1]
+    parent = tag.parent
+    if combinator == '>':
+        return parent is not None and _matches(chain, i - 2, parent, scope)
+    while parent is not None:
+        if _matches(chain, i - 2, parent, scope):
+            return True
+        parent = parent.parent
+    return False
+
+
+class Field:
+    """One thing to pull out of an element.
+
+    selector picks the element(s); get turns a match into the value
+    (the Tag itself if None; a nested Schema is run on the match).
+    A single field takes the first match in document order and is
+    None without one, like select_one(); a field with many=True takes
+    every match, like select().
+    """
+
+    __slots__ = ('selector', 'get', 'many', '_chain')
+
+    def __init__(self, selector, get=None, many=False):
+        self.selector = selector
+        self.get = get
+        self.many = many
+        self._chain = _compile(selector)
+
+    def _value(self, tag):
+        if self.get is None:
+            return tag
+        if isinstance(self.get, Schema):
+            return self.get.extract(tag)
+        return self.get(tag)
+
+
+class Schema:
+    """A set of named Fields, compiled once and then filled in a
+    single walk over the descendants of whatever they are run on.
+    """
+
+    __slots__ = ('fields', '_by_name', '_anyname')
+
+    def __init__(self, **fields):
+        self.fields = fields
+        # index fields by the tag name their selector ends on, so that
+        # most tags are turned away with one dict lookup
+        self._by_name = {}
+        self._anyname = []
+        for key, field in fields.items():
+            last = field._chain[-1]
+            if last is _SCOPE:
+                raise ValueError(f'{field.selector!r} selects nothing')
+            if last.name is None:
+                self._anyname.append((key, field))
+            else:
+                self._by_name.setdefault(last.name, []).append((key, field))
+
+    def extract(self, element):
+        # here rather than at the top, so that importing mbapi.api
+        # doesn't load bs4 before there is anything to parse
+        from bs4 import Tag
+
+        result = {key: [] if field.many else None
+                  for key, field in self.fields.items()}
+        pending = sum(not field.many for field in self.fields.values())
+        greedy = any(field.many for field in self.fields.values())
+        found = set()
+
+        for tag in element.descendants:
+            if not isinstance(tag, Tag):
+                continue
+            candidates = self._by_name.get(tag.name, ())
+            if self._anyname:
+                candidates = [*candidates, *self._anyname]
+            for key, field in candidates:
+                if not field.many and key in found:
+                    continue
+                chain = field._chain
+                if not _matches(chain, len(chain) - 1, tag, element):
+                    continue
+                if field.many:
+                    result[key].append(field._value(tag))
+                else:
+                    result[key] = field._value(tag)
+                    found.add(key)
+                    pending -= 1
+            if not pending and not greedy:
+                break
+
+        return result
+
+
+_MISSING = object()
+
+def attr(name, default=_MISSING):
+    """get= for the value of an attribute.  Without a default,
+    a missing attribute raises KeyError just like tag[name].
+    """
+    if default is _MISSING:
+        return lambda tag: tag[name]
+    return lambda tag: tag.get(name, default)
+
 
-__all__ = []
+def text(strip=False):
+    """get= for the text of an element."""
+    if strip:
+        return lambda tag: tag.text.strip()
+    return lambda tag: tag.text
@@ -0,0 +1,223 @@
+"""many accounts, one server.
+
+    with SessionPool('school.managebac.com', concurrency=8) as pool:
+        pool.load_sessions(glob.glob('sessions/*.session'))
+        whoami = pool.map('whoami')
+        for name, future in whoami.items():
+            print(name, future.result()['user_id'])
+        pool.save_sessions('sessions')
+
+every account gets its own StudentAPI and so its own cookies, but
+they all go through one HTTPAdapter, so a connection (and its TLS
+handshake) set up for one account is reused by the next.
+
+jobs are run by `concurrency` threads in total.  an account runs
+one job at a time, since every response rotates its token, and
+accounts take turns: the one that just had a job goes to the back
+of the line, so nobody starves behind an account with 500 class
+pages queued up.
+"""
+import collections
+import concurrent.futures
+import logging
+import os
+import threading
+
+import requests
+
+from .api import StudentAPI
+
+
+__all__ = ['SessionPool']
+
+logger = logging.getLogger(__name__)
+
+SESSION_SUFFIX = '.session'
+
+
+class SessionPool:
+    """StudentAPI clients for many accounts on one server.
+
+    Keyword arguments not listed are passed on to every StudentAPI
+    (a shared limiter and retry policy, a cache, ...).
+    """
+
+    def __init__(self, domain, port=None, protocol='https',
+                 concurrency=8, **options):
+        if not isinstance(concurrency, int):
+            raise TypeError('concurrency must be an int')
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+        self._domain = domain
+        self._port = port
+        self._protocol = protocol
+        self._options = options
+        self.concurrency = concurrency
+        # one host, and at most one connection per worker
+        self._adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=concurrency)
+
+        self._apis = {}
+        # name -> jobs waiting; an account is in _ready exactly when
+        # it has jobs waiting and none running
+        self._queues = {}
+        self._ready = collections.deque()
+        self._busy = set()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+        return None
+
+    def __len__(self):
+        return len(self._apis)
+
+    def __iter__(self):
+        return iter(list(self._apis))
+
+    def __contains__(self, name):
+        return name in self._apis
+
+    def __getitem__(self, name):
+        return self._apis[name]
+
+    def add(self, name, token=None, expires=None):
+        """Add an account, or update its token, and return its
+        StudentAPI.
+        """
+        with self._cond:
+            api = self._apis.get(name)
+            if api is None:
+                api = StudentAPI(self._domain, self._port, self._protocol,
+                                 adapter=self._adapter, **self._options)
+                api.identity = name
+                self._apis[name] = api
+                self._queues[name] = collections.deque()
+        if token is not None:
+            api.token = token
+        if expires is not None:
+            api.expires = expires
+        return api
+
+    def remove(self, name):
+        """Forget an account.  Its jobs not yet started are cancelled."""
+        with self._cond:
+            api = self._apis.pop(name)
+            queue = self._queues.pop(name)
+            try:
+                self._ready.remove(name)
+            except ValueError:
+                pass
+        for future, *_ in queue:
+            future.cancel()
+        api.close()
+
+    def load_tokens(self, tokens):
+        """Add accounts from a mapping of name -> token."""
+        for name, token in tokens.items():
+            self.add(name, token)
+
+    def load_sessions(self, files):
+        """Add an account for every session file (as written by
+        save_session()), named after the file.
+        """
+        for file in files:
+            name = os.path.basename(file)
+            if name.endswith(SESSION_SUFFIX):
+                name = name[:-len(SESSION_SUFFIX)]
+            self.add(name).load_session(file)
+
+    def save_sessions(self, directory):
+        """Write every account's session to directory/NAME.session."""
+        for name, api in list(self._apis.items()):
+            if api.token is not None:
+                api.save_session(
+                    os.path.join(directory, name + SESSION_SUFFIX))
+
+    def submit(self, name, job, *args, **kwargs):
+        """Queue job for the account and return a Future.
+
+        job is either the name of a StudentAPI method ('whoami',
+        'get_class_page_json', ...) or a callable taking the
+        StudentAPI as its first argument.
+        """
+        if isinstance(job, str):
+            job = getattr(StudentAPI, job)
+        if not callable(job):
+            raise TypeError(f'job should be callable, not {job!r}')
+        future = concurrent.futures.Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('pool is closed')
+            queue = self._queues[name]
+            if not queue and name not in self._busy:
+                self._ready.append(name)
+            queue.append((future, job, args, kwargs))
+            self._start_workers()
+            self._cond.notify()
+        return future
+
+    def map(self, job, *args, names=None, **kwargs):
+        """submit() the same job for every account (or just `names`),
+        returning a dict of name -> Future.
+        """
+        if names is None:
+            names = list(self._apis)
+        return {name: self.submit(name, job, *args, **kwargs)
+                for name in names}
+
+    def _start_workers(self):
+        # with self._cond held
+        while len(self._workers) < self.concurrency:
+            worker = threading.Thread(
+                target=self._work, daemon=True,
+                name=f'SessionPool-{len(self._workers)}')
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._closed:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                name = self._ready.popleft()
+                future, job, args, kwargs = self._queues[name].popleft()
+                self._busy.add(name)
+                api = self._apis[name]
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = job(api, *args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+
+            with self._cond:
+                self._busy.discard(name)
+                # to the back of the line
+                if self._queues.get(name):
+                    self._ready.append(name)
+                    self._cond.notify()
+
+    def close(self, wait=True):
+        """Stop taking jobs.  The ones queued still run; if wait,
+        block until they are done.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            workers = list(self._workers)
+        if wait:
+            for worker in workers:
+                worker.join()
+            for api in self._apis.values():
+                api.close()
+            self._adapter.close()
@@ -0,0 +1,187 @@
+"""compact records instead of dicts.
+
+a dict per user is a lot of memory once there are tens of thousands
+of them, with the same two dozen keys stored over and over.  these
+classes keep the known fields in __slots__ instead, and share one
+tuple of keys between all records with the same keys in the same
+order, which is how to_dict() gives back exactly the dict the
+record was made from.
+
+    api = StudentAPI(domain, records=True)
+    roster = api.get_class_page_json(1000)
+    roster.students[0].user_name
+    json.dumps(roster.to_dict())     # same JSON as records=False
+
+fields that a record doesn't have read as None; fields nobody
+expected (say, something new in the LOU.identify() data) are kept
+on the side and come back out of to_dict() all the same.
+"""
+
+__all__ = ['Record', 'Avatar', 'User', 'ClassInfo', 'ClassList',
+           'Roster', 'convert']
+
+# one tuple per distinct key order, shared by every record using it
+_KEYS = {}
+
+
+def _plain(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+class Record:
+    """Base class: subclasses list their fields in __slots__ and
+    the record type of nested fields in _nested.
+    """
+
+    __slots__ = ('_keys', '_extra')
+
+    _nested = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = set()
+        for klass in cls.__mro__:
+            fields.update(getattr(klass, '__slots__', ()))
+        cls._fields = frozenset(fields - set(Record.__slots__))
+
+    @classmethod
+    def from_dict(cls, d):
+        self = cls.__new__(cls)
+        keys = tuple(d)
+        self._keys = _KEYS.setdefault(keys, keys)
+        extra = None
+        for key, value in d.items():
+            kind = cls._nested.get(key)
+            if kind is not None and value is not None:
+                if isinstance(value, list):
+                    value = [kind.from_dict(item) for item in value]
+                else:
+                    value = kind.from_dict(value)
+            if key in cls._fields:
+                object.__setattr__(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        self._extra = extra
+        return self
+
+    def __getattr__(self, name):
+        # only called for fields that were never set
+        if name in type(self)._fields:
+            return None
+        if name not in Record.__slots__:
+            extra = self._extra
+            if extra is not None and name in extra:
+                return extra[name]
+        raise AttributeError(
+            f'{type(self).__name__!r} object has no attribute {name!r}')
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self._keys else default
+
+    def keys(self):
+        return self._keys
+
+    def to_dict(self):
+        """The dict this record was made from, as a fresh copy."""
+        return {key: _plain(getattr(self, key)) for key in self._keys}
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{key}={getattr(self, key)!r}'
+                           for key in self._keys)
+        return f'{type(self).__name__}({fields})'
+
+
+class Avatar(Record):
+    __slots__ = ('avatar_url', 'user_initials', 'user_id')
+
+
+class User(Record):
+    # the avatar is nested in user_avatar on class pages, but mixed
+    # into the user in the class list, hence both
+    __slots__ = (
+        'user_id', 'user_name', 'user_first_name', 'user_nickname',
+        'user_last_name', 'user_second_name', 'user_email', 'user_role',
+        'user_created_at', 'user_url', 'user_tel', 'user_avatar',
+        'avatar_url', 'user_initials',
+    )
+
+    _nested = dict(user_avatar=Avatar)
+
+
+class ClassInfo(Record):
+    # the sections stay as they come: lists, or mbapi.api.LazySection
+    # views with lazy_sections
+    __slots__ = ('class_id', 'class_name', 'class_url', 'class_icon',
+                 'class_stats', 'class_teachers', 'class_units',
+                 'class_tasks', 'class_updates', 'class_subject',
+                 'class_student_count')
+
+    _nested = dict(class_teachers=User)
+
+
+class ClassList(Record):
+    """What get_my_classes_json() returns."""
+
+    __slots__ = ('whoami', 'classes')
+
+    _nested = dict(whoami=User, classes=ClassInfo)
+
+
+class Roster(Record):
+    """What get_class_page_json() returns."""
+
+    __slots__ = ('whoami', 'class_', 'teachers', 'students')
+
+    _nested = {'whoami': User, 'class': ClassInfo, 'teachers': User,
+               'students': User}
+
+    # 'class' is a keyword, so the field is called class_
+    @classmethod
+    def from_dict(cls, d):
+        self = super().from_dict(d)
+        if self._extra is not None and 'class' in self._extra:
+            object.__setattr__(self, 'class_', self._extra.pop('class'))
+            if not self._extra:
+                self._extra = None
+        return self
+
+    def __getattr__(self, name):
+        if name == 'class':
+            return self.class_
+        return super().__getattr__(name)
+
+
+# *_to_json function -> the record its result becomes
+_FUNCTIONS = {
+    'student_home_to_json': User,
+    'student_classes_to_json': ClassList,
+    'student_class_page_to_json': Roster,
+}
+
+
+def convert(func, result):
+    """Turn what a *_to_json function returned into its record."""
+    return _FUNCTIONS[func.__name__].from_dict(result)
@@ -0,0 +1,168 @@
+"""one entry per person, however many classes they show up in.
+
+    registry = UserRegistry()
+    classes = api.get_my_classes_json()
+    registry.add_classes(classes)
+    for class_json in classes['classes']:
+        registry.add_roster(api.get_class_page_json(class_json['class_id']))
+
+    registry.classes_of('30001')        # {'1000': 'student',
+                                        #  '1003': 'teacher'}
+    registry.classmates('30001')        # user IDs sharing a class
+    registry.by_name('nick30001')       # [{...}]
+
+users are told apart by user_id, and what different pages say about
+the same user is merged the way the parsers merge everything else
+(see _update_dict): new keys are added and conflicting values turn
+into lists.  add_roster() and add_classes() swap the members of what
+they are given for the registry's copy, so a user in 20 rosters is
+held once, not 20 times.
+"""
+import threading
+
+from .api import _update_dict
+
+
+__all__ = ['UserRegistry']
+
+_NAME_FIELDS = ('user_name', 'user_first_name', 'user_last_name',
+                'user_nickname', 'user_second_name')
+
+
+def _names(user):
+    for field in _NAME_FIELDS:
+        value = user.get(field)
+        values = value if isinstance(value, list) else (value,)
+        for name in values:
+            if isinstance(name, str) and name:
+                yield name.casefold()
+
+
+class UserRegistry:
+    """Users by user_id, with indexes by class and by name.
+
+    Records from mbapi.records are taken too, but the registry
+    always stores and returns dicts.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = {}
+        # user_id -> {class_id: role}, and the other way round
+        self._classes = {}
+        self._members = {}
+        # casefolded name -> set of user_id
+        self._names = {}
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, user_id):
+        return user_id in self._users
+
+    def __iter__(self):
+        return iter(list(self._users))
+
+    def __getitem__(self, user_id):
+        return self._users[user_id]
+
+    def get(self, user_id, default=None):
+        return self._users.get(user_id, default)
+
+    def add(self, user, class_id=None, role=None):
+        """Merge user into the registry and return the registry's
+        dict for them.  Users without a user_id can't be told apart
+        and are returned as they are.  If class_id is given, the
+        user is recorded as a member of that class, as role.
+        """
+        if hasattr(user, 'to_dict'):
+            user = user.to_dict()
+        user_id = user.get('user_id')
+        if user_id is None:
+            return user
+        with self._lock:
+            interned = self._users.get(user_id)
+            if interned is None:
+                interned = self._users[user_id] = dict(user)
+            elif interned is not user:
+                _update_dict(interned, user)
+            for name in _names(interned):
+                self._names.setdefault(name, set()).add(user_id)
+            if class_id is not None:
+                self._classes.setdefault(user_id, {})[class_id] = role
+                self._members.setdefault(class_id, {})[user_id] = role
+        return interned
+
+    def _add_all(self, users, class_id, role):
+        # in place, so the caller's lists share the interned dicts
+        for i, user in enumerate(users):
+            users[i] = self.add(user, class_id, role)
+
+    def add_roster(self, page):
+        """add() everyone on a get_class_page_json() result, and
+        return it with its members swapped for the registry's.
+        """
+        if hasattr(page, 'to_dict'):
+            page = page.to_dict()
+        class_id = (page.get('class') or {}).get('class_id')
+        if page.get('whoami') is not None:
+            page['whoami'] = self.add(page['whoami'])
+        for field, role in (('teachers', 'teacher'), ('students', 'student')):
+            if page.get(field):
+                self._add_all(page[field], class_id, role)
+        return page
+
+    def add_classes(self, classes):
+        """add() the user and the teachers of a get_my_classes_json()
+        result, and return it with them swapped for the registry's.
+        The user is counted as a student of every class.
+        """
+        if hasattr(classes, 'to_dict'):
+            classes = classes.to_dict()
+        whoami = classes.get('whoami')
+        if whoami is not None:
+            whoami = classes['whoami'] = self.add(whoami)
+        for class_json in classes.get('classes') or ():
+            class_id = class_json.get('class_id')
+            if class_json.get('class_teachers'):
+                self._add_all(class_json['class_teachers'],
+                              class_id, 'teacher')
+            if whoami is not None and class_id is not None:
+                self.add(whoami, class_id, 'student')
+        return classes
+
+    def classes_of(self, user_id):
+        """{class_id: role} for every class the user is in."""
+        with self._lock:
+            return dict(self._classes.get(user_id, {}))
+
+    def members(self, class_id, role=None):
+        """The users of a class, only those with role if given."""
+        with self._lock:
+            return [self._users[user_id] for user_id, their_role
+                    in self._members.get(class_id, {}).items()
+                    if role is None or their_role == role]
+
+    def shared_classes(self, *user_ids):
+        """Class IDs all of the users are in together."""
+        with self._lock:
+            sets = [self._classes.get(user_id, {}).keys()
+                    for user_id in user_ids]
+            return set.intersection(*map(set, sets)) if sets else set()
+
+    def classmates(self, user_id):
+        """IDs of everyone sharing at least one class with the user."""
+        with self._lock:
+            mates = set()
+            for class_id in self._classes.get(user_id, ()):
+                mates.update(self._members[class_id])
+            mates.discard(user_id)
+            return mates
+
+    def by_name(self, name):
+        """Users with name as their full, first, last, second or
+        nick name, ignoring case.
+        """
+        with self._lock:
+            return [self._users[user_id] for user_id
+                    in sorted(self._names.get(name.casefold(), ()))]
@@ -0,0 +1,166 @@
+"""all the sessions in one SQLite file.
+
+    with SessionStore('sessions.db') as store:
+        store.load(api, 'alice')
+        ...
+        store.save(api, 'alice')
+
+instead of one .session file per account, rewritten on every run.
+writes are atomic upserts, save_all() writes a whole crawl's worth
+in one transaction, and due() finds the tokens about to expire with
+a single indexed query, so a scheduler can refresh just those.
+
+expiry times are stored as seconds since the epoch, like in the
+.session files.
+"""
+import datetime
+import sqlite3
+import threading
+import time
+
+from .util import _from_epoch
+
+
+__all__ = ['SessionStore']
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,
+    secret TEXT NOT NULL,
+    expires REAL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires);
+'''
+
+_UPSERT = '''
+INSERT INTO sessions (name, secret, expires, updated)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET
+    secret = excluded.secret,
+    expires = excluded.expires,
+    updated = excluded.updated
+'''
+
+
+def _epoch(expires):
+    if expires is None or isinstance(expires, (int, float)):
+        return expires
+    if isinstance(expires, datetime.datetime):
+        return expires.timestamp()
+    raise TypeError(f'expires should be a datetime or a number, '
+                    f'not {expires!r}')
+
+
+class SessionStore:
+    """Session tokens by account name, in the SQLite database at
+    path (':memory:' works too).  Safe to share between threads.
+    """
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            # readers don't block the writer and vice versa
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, tb):
+        self.close()
+        return None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def __len__(self):
+        return self._query('SELECT COUNT(*) FROM sessions')[0][0]
+
+    def __contains__(self, name):
+        return bool(self._query(
+            'SELECT 1 FROM sessions WHERE name = ?', (name,)))
+
+    def __iter__(self):
+        return iter([name for name, in self._query(
+            'SELECT name FROM sessions ORDER BY name')])
+
+    def get(self, name):
+        """The session of an account as a dict like the ones in
+        .session files (secret and expires), or None.
+        """
+        rows = self._query(
+            'SELECT secret, expires FROM sessions WHERE name = ?', (name,))
+        if not rows:
+            return None
+        secret, expires = rows[0]
+        return dict(secret=secret, expires=expires)
+
+    def put(self, name, secret, expires=None):
+        """Insert or replace the session of an account.  expires is a
+        datetime, seconds since the epoch or None.
+        """
+        self.put_many([(name, secret, expires)])
+
+    def put_many(self, sessions):
+        """put() every (name, secret, expires) in one transaction."""
+        now = time.time()
+        rows = [(name, secret, _epoch(expires), now)
+                for name, secret, expires in sessions]
+        with self._lock, self._db:
+            self._db.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def delete(self, name):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM sessions WHERE name = ?', (name,))
+
+    def load(self, api, name):
+        """Set the token (and expiry) of api from the store, like
+        api.load_session() does from a file.  Returns the session, or
+        None with api left alone if there is none.
+        """
+        session = self.get(name)
+        if session is not None:
+            api.token = session['secret']
+            if session['expires'] is not None:
+                api.expires = _from_epoch(session['expires'])
+        return session
+
+    def save(self, api, name):
+        """The store's api.save_session()."""
+        self.put(name, api.token, api.expires)
+
+    def save_all(self, apis):
+        """save() every account of a mapping of name -> client (a
+        SessionPool will do) in one transaction.  Clients without a
+        token are skipped.
+        """
+        return self.put_many(
+            (name, api.token, api.expires)
+            for name, api in ((name, apis[name]) for name in apis)
+            if api.token is not None)
+
+    def load_all(self, pool):
+        """pool.add(name, token, expires) for every stored session."""
+        for name, secret, expires in self._query(
+                'SELECT name, secret, expires FROM sessions'):
+            pool.add(name, secret,
+                     _from_epoch(expires) if expires is not None else None)
+
+    def due(self, within=0, now=None):
+        """Names of the accounts whose token has expired or will
+        within `within` seconds from now, soonest first.  Tokens with
+        no known expiry are never due.
+        """
+        if now is None:
+            now = time.time()
+        return [name for name, in self._query(
+            'SELECT name FROM sessions WHERE expires <= ? ORDER BY expires',
+            (_epoch(now) + within,))]
@@ -0,0 +1,217 @@
+"""being polite to the server, and surviving when it isn't.
+
+    limiter = RateLimiter(rate=5, burst=10)
+    retry = RetryPolicy(attempts=5, breaker=CircuitBreaker())
+    apis = [StudentAPI(domain, limiter=limiter, retry=retry)
+            for _ in accounts]
+
+share one limiter and one retry policy among every StudentAPI (and
+thread) talking to the same server: the rate is per host, not per
+account, and when the circuit breaker trips everybody waits.
+
+all waiting is done through reserve()/wait() returning a number of
+seconds, so that the asyncio client can sleep without blocking.
+"""
+import email.utils
+import random
+import threading
+import time
+
+
+__all__ = ['TokenBucket', 'RateLimiter', 'RetryPolicy', 'CircuitBreaker',
+           'retry_after']
+
+
+class TokenBucket:
+    """`rate` requests per second on average, up to `burst` at once."""
+
+    __slots__ = ('rate', 'burst', '_tokens', '_stamp', '_lock')
+
+    def __init__(self, rate, burst=1):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self._stamp:
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+
+    def reserve(self):
+        """Take a token and return how many seconds to wait before
+        using it.  Tokens may go into debt, which is what queues up
+        the callers behind each other.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return max(0.0, self._stamp - now)
+            return self._stamp - now - self._tokens / self.rate
+
+    def pause(self, seconds):
+        """Hand out nothing for the next `seconds`."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            until = now + seconds
+            if until > self._stamp:
+                # tokens don't pile up while paused
+                self._stamp = until
+                self._tokens = min(self._tokens, 1)
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RateLimiter:
+    """One TokenBucket per host, created as hosts show up."""
+
+    def __init__(self, rate, burst=1):
+        TokenBucket(rate, burst)    # check the arguments now
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(
+                    self.rate, self.burst)
+            return bucket
+
+    def reserve(self, host):
+        return self.bucket(host).reserve()
+
+    def pause(self, host, seconds):
+        self.bucket(host).pause(seconds)
+
+    def acquire(self, host):
+        self.bucket(host).acquire()
+
+
+class CircuitBreaker:
+    """Stop everybody once a host fails `threshold` times in a row.
+
+    The breaker then stays open for `cooldown` seconds, after which
+    a single request is let through as a probe: if it succeeds, the
+    breaker closes, and if not, it opens for another cooldown.
+    Nobody gets an error while the breaker is open, they just wait.
+    """
+
+    __slots__ = ('threshold', 'cooldown', '_hosts', '_lock')
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        if threshold < 1:
+            raise ValueError('threshold must be at least 1')
+        self.threshold = threshold
+        self.cooldown = cooldown
+        # host -> [consecutive failures, open until, probe in flight]
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        """Seconds to wait before the next request to host (0 to go
+        ahead).  Ask again after waiting.
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state[0] < self.threshold:
+                return 0.0
+            now = time.monotonic()
+            if now < state[1]:
+                return state[1] - now
+            if state[2]:
+                # somebody is probing already; check back soon
+                return min(1.0, self.cooldown)
+            state[2] = True
+            return 0.0
+
+    def record(self, host, ok):
+        with self._lock:
+            state = self._hosts.setdefault(host, [0, 0.0, False])
+            state[2] = False
+            if ok:
+                state[0] = 0
+                return
+            state[0] += 1
+            if state[0] >= self.threshold:
+                state[1] = time.monotonic() + self.cooldown
+
+    def is_open(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            return state is not None and state[0] >= self.threshold
+
+
+def retry_after(value):
+    """Seconds from a Retry-After header (either form), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Retry up to `attempts` times in total on connection errors
+    and on the `statuses`, sleeping a random time between 0 and
+    backoff * 2**retry (full jitter, capped at `cap`) in between,
+    or as long as the server says in Retry-After.
+    """
+
+    __slots__ = ('attempts', 'backoff', 'cap', 'statuses', 'breaker',
+                 '_random')
+
+    def __init__(self, attempts=5, backoff=0.5, cap=30.0,
+                 statuses=(429, 500, 502, 503, 504), breaker=None):
+        if attempts < 1:
+            raise ValueError('attempts must be at least 1')
+        self.attempts = attempts
+        self.backoff = backoff
+        self.cap = cap
+        self.statuses = frozenset(statuses)
+        self.breaker = breaker
+        self._random = random.Random()
+
+    def retryable(self, status):
+        return status in self.statuses
+
+    def delay(self, attempt, headers=None):
+        """How long to sleep after the attempt-th try (counting
+        from 0) failed, given the failed response's headers if any.
+        """
+        if headers is not None:
+            seconds = retry_after(headers.get('Retry-After'))
+            if seconds is not None:
+                return seconds
+        return self._random.uniform(
+            0, min(self.cap, self.backoff * 2 ** attempt))
+
+    def wait(self, host):
+        if self.breaker is None:
+            return 0.0
+        return self.breaker.wait(host)
+
+    def record(self, host, ok):
+        if self.breaker is not None:
+            self.breaker.record(host, ok)